@@ -4,6 +4,7 @@ import inspect
 import os
 import sys
 import traceback
+from concurrent.futures import ThreadPoolExecutor
 from copy import deepcopy
 from functools import partial
 from itertools import cycle
@@ -26,6 +27,8 @@ from pyqtgraph import (PlotDataItem, PlotWidget, mkPen, time,
                        BarGraphItem, mkBrush)
 from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg
 
+from .pyqtgraph_ptyp import _get_ds_kernels, _get_kernels, has_numba
+
 
 class EvalParam(QLineEdit):
     textchange = pyqtSignal(object)
@@ -232,6 +235,10 @@ class ResultDialog(QDialog):
         self.startup_widget.plotItem.setLabel('bottom', 'Benchmark')
         self.startup_widget.plotItem.setLabel('left', 'Time', 's')
         tab_widget.addTab(self.startup_widget, 'Startup')
+        self.mean_fps_widget = PlotWidget()
+        self.mean_fps_widget.plotItem.setLabel('bottom', 'Benchmark')
+        self.mean_fps_widget.plotItem.setLabel('left', 'Mean FPS')
+        tab_widget.addTab(self.mean_fps_widget, 'Mean FPS')
         scroll_area = QScrollArea()
         scroll_area.setSizePolicy(QSizePolicy.Maximum, QSizePolicy.Preferred)
         legend_widget = QWidget()
@@ -248,11 +255,30 @@ class ResultDialog(QDialog):
                                         width=1, brush=brush)
             self.startup_widget.addItem(startup_item)
 
+            # Compare e.g. the render-modes by the mean FPS of each run.
+            mean_fps = np.mean(fps_y) if len(fps_y) > 0 else 0
+            mean_fps_item = BarGraphItem(x=[idx + 1], height=[mean_fps],
+                                         width=1, brush=brush)
+            self.mean_fps_widget.addItem(mean_fps_item)
+
             bm_func = bm_run.split(' ')[0]
             p_dict = self.pw.benchmark_runs[bm_func][bm_run]
-            legend_string = f'<b>{idx + 1}: {bm_run}</b><br>'
+            legend_string = f'<b>{idx + 1}: {bm_run}</b> ' \
+                            f'({mean_fps:.1f} FPS)<br>'
             legend_string += '<br>'.join(
                 [f'{p} = {p_dict[p]}' for p in p_dict])
+            cache_stats = self.pw.benchmark_results[bm_run].get('ds_cache')
+            if cache_stats is not None:
+                legend_string += '<br><i>DS-Cache: ' + ', '.join(
+                    [f'{k} = {v}' for k, v in cache_stats.items()]) + '</i>'
+            update_counts = self.pw.benchmark_results[bm_run].get('updates')
+            if update_counts is not None:
+                legend_string += '<br><i>Updates: ' + ', '.join(
+                    [f'{k} = {v}' for k, v in update_counts.items()]) + '</i>'
+            preload_stats = self.pw.benchmark_results[bm_run].get('preload')
+            if preload_stats is not None:
+                legend_string += '<br><i>Preload: ' + ', '.join(
+                    [f'{k} = {v}' for k, v in preload_stats.items()]) + '</i>'
             legend_label = QLabel(legend_string)
             legend_label.setStyleSheet(f"QLabel {{ color : {color}}}")
             legend_layout.addWidget(legend_label)
@@ -264,6 +290,223 @@ class ResultDialog(QDialog):
         self.setLayout(layout)
 
 
+def compare_kernels(n_channels=306, n_times=36000, ds=50, n_repeats=5):
+    """Time the NumPy- and the numba-kernels of the pyqtgraph-backend."""
+    data = np.random.randn(n_channels, n_times)
+    kernel_sets = {'NumPy': _get_kernels(use_numba=False)}
+    if has_numba:
+        kernel_sets['numba'] = _get_kernels(use_numba=True)
+    results = dict()
+    for kernel_name in ['subsample', 'mean', 'peak', 'm4', 'lttb',
+                        'column_means']:
+        results[kernel_name] = dict()
+        for set_name, kernels in kernel_sets.items():
+            kernel = kernels[kernel_name]
+            if kernel_name == 'column_means':
+                args = (data, 1920, n_times // 1920)
+            else:
+                # With DC-removal like in _update_data
+                args = (data, ds, True)
+            # Warm up (this compiles the numba-kernels)
+            kernel(*args)
+            start = time()
+            for _ in range(n_repeats):
+                kernel(*args)
+            results[kernel_name][set_name] = (time() - start) / n_repeats
+
+    return results
+
+
+class KernelDialog(QDialog):
+    def __init__(self, parent_widget):
+        super().__init__(parent_widget)
+        self.pw = parent_widget
+        self.results = compare_kernels()
+
+        self.init_ui()
+        self.show()
+
+    def init_ui(self):
+        layout = QGridLayout()
+        set_names = list(self.results['peak'])
+        headers = ['Kernel'] + [f'{sn} [ms]' for sn in set_names]
+        if has_numba:
+            headers.append('Speedup')
+        else:
+            layout.addWidget(QLabel('numba is not installed!'),
+                             len(self.results) + 1, 0, 1, len(headers))
+        for col_idx, header in enumerate(headers):
+            layout.addWidget(QLabel(f'<b>{header}</b>'), 0, col_idx)
+        for row_idx, kernel_name in enumerate(self.results):
+            timings = self.results[kernel_name]
+            layout.addWidget(QLabel(kernel_name), row_idx + 1, 0)
+            for col_idx, set_name in enumerate(set_names):
+                layout.addWidget(QLabel(f'{timings[set_name] * 1e3:.3f}'),
+                                 row_idx + 1, col_idx + 1)
+            if has_numba:
+                speedup = timings['NumPy'] / timings['numba']
+                layout.addWidget(QLabel(f'{speedup:.1f}x'),
+                                 row_idx + 1, len(set_names) + 1)
+        self.setLayout(layout)
+
+
+def make_spike_data(n_channels=30, n_times=600000, n_spikes=20, seed=42):
+    """Create noise with single-sample spikes, which must not be omitted.
+
+    Returns the data and the channel, sample and amplitude of each spike.
+    """
+    rng = np.random.default_rng(seed)
+    data = rng.standard_normal((n_channels, n_times)) * 0.1
+    spike_chs = np.repeat(np.arange(n_channels), n_spikes)
+    spike_idxs = rng.integers(0, n_times, len(spike_chs))
+    spike_amps = rng.uniform(5, 10, len(spike_chs)) \
+        * rng.choice([-1, 1], len(spike_chs))
+    data[spike_chs, spike_idxs] = spike_amps
+
+    return data, (spike_chs, spike_idxs, spike_amps)
+
+
+def compare_ds_methods(n_pixels=1000, bins_per_pixel=5, n_repeats=3,
+                       **spike_kwargs):
+    """Compare the downsampling-methods on synthetic spike-data.
+
+    For each registered method the number of vertices per channel, the time,
+    the fraction of spikes found in the vertices and the error of the
+    envelope (minimum/maximum per pixel) relative to the data-range
+    are returned.
+    """
+    data, (spike_chs, _, spike_amps) = make_spike_data(**spike_kwargs)
+    n_channels, n_times = data.shape
+    ds = max(n_times // (n_pixels * bins_per_pixel), 1)
+    sample_idxs = np.arange(n_times)
+    pixels = np.arange(n_times) * n_pixels // n_times
+    true_max = np.full((n_channels, n_pixels), -np.inf)
+    true_min = np.full((n_channels, n_pixels), np.inf)
+    for ch in range(n_channels):
+        np.maximum.at(true_max[ch], pixels, data[ch])
+        np.minimum.at(true_min[ch], pixels, data[ch])
+    data_range = data.max() - data.min()
+    results = dict()
+    for method, ds_kernel in _get_ds_kernels().items():
+        ds_func = ds_kernel['func']
+        # Warm up (this compiles the numba-kernels)
+        ds_func(sample_idxs, data, ds)
+        start = time()
+        for _ in range(n_repeats):
+            # The sample-indices are passed as times to get
+            # the position of the vertices.
+            vertex_idxs, out = ds_func(sample_idxs, data, ds)
+        duration = (time() - start) / n_repeats
+        vertex_idxs = np.broadcast_to(vertex_idxs, out.shape)
+        recalled = [np.any(np.isclose(out[ch], amp))
+                    for ch, amp in zip(spike_chs, spike_amps)]
+        envelope_errors = list()
+        for ch in range(n_channels):
+            vertex_pixels = vertex_idxs[ch] * n_pixels // n_times
+            vertex_max = np.full(n_pixels, -np.inf)
+            vertex_min = np.full(n_pixels, np.inf)
+            np.maximum.at(vertex_max, vertex_pixels, out[ch])
+            np.minimum.at(vertex_min, vertex_pixels, out[ch])
+            # Pixels without a vertex are drawn by the connecting lines.
+            mask = np.isfinite(vertex_max)
+            envelope_errors.append(np.mean(
+                np.abs(true_max[ch][mask] - vertex_max[mask])
+                + np.abs(true_min[ch][mask] - vertex_min[mask])))
+        results[method] = dict(vertices=out.shape[1], time=duration,
+                               spike_recall=np.mean(recalled),
+                               envelope_error=np.mean(envelope_errors)
+                               / data_range)
+
+    return results
+
+
+class DsMethodDialog(QDialog):
+    def __init__(self, parent_widget):
+        super().__init__(parent_widget)
+        self.pw = parent_widget
+        self.results = compare_ds_methods()
+
+        self.init_ui()
+        self.show()
+
+    def init_ui(self):
+        layout = QGridLayout()
+        headers = ['Method', 'Vertices/Channel', 'Time [ms]',
+                   'Spike-Recall', 'Envelope-Error']
+        for col_idx, header in enumerate(headers):
+            layout.addWidget(QLabel(f'<b>{header}</b>'), 0, col_idx)
+        for row_idx, method in enumerate(self.results):
+            result = self.results[method]
+            values = [method, str(result['vertices']),
+                      f'{result["time"] * 1e3:.3f}',
+                      f'{result["spike_recall"] * 100:.1f} %',
+                      f'{result["envelope_error"] * 100:.2f} %']
+            for col_idx, value in enumerate(values):
+                layout.addWidget(QLabel(value), row_idx + 1, col_idx)
+        self.setLayout(layout)
+
+
+def compare_preload_threads(browser, thread_counts=None, max_chunks=32):
+    """Time loading and processing the preload-chunks with more threads.
+
+    For each number of threads the throughput (in bytes/s of processed
+    data) of the first max_chunks chunks of the LoadRunner is returned.
+    """
+    if thread_counts is None:
+        n_cores = os.cpu_count() or 1
+        thread_counts = sorted({1, n_cores} | {2 ** k for k in range(8)
+                                              if 2 ** k < n_cores})
+    n_times = len(browser.mne.inst)
+    picks = browser.mne.ch_order
+    chunk_size = browser._get_load_chunk_size(n_times)
+    chunks = [(start, min(start + chunk_size, n_times)) for start
+              in range(0, n_times, chunk_size)][:max_chunks]
+    results = dict()
+    browser._stash_remove_dc()
+    try:
+        for n_threads in thread_counts:
+            start_time = time()
+            with ThreadPoolExecutor(n_threads) as executor:
+                n_bytes = sum([data.nbytes for _, data in executor.map(
+                    lambda chunk: browser._load_processed(
+                        *chunk, picks, stashed_dc=True), chunks)])
+            results[n_threads] = n_bytes / (time() - start_time)
+    finally:
+        browser._restore_remove_dc()
+
+    return results
+
+
+class PreloadScalingDialog(QDialog):
+    def __init__(self, parent_widget):
+        super().__init__(parent_widget)
+        self.pw = parent_widget
+        self.results = compare_preload_threads(self.pw.backend)
+
+        self.init_ui()
+        self.show()
+
+    def init_ui(self):
+        layout = QVBoxLayout()
+        plot_widget = PlotWidget()
+        plot_widget.plotItem.setLabel('bottom', 'Threads')
+        plot_widget.plotItem.setLabel('left', 'Throughput', 'B/s')
+        thread_counts = list(self.results)
+        throughputs = list(self.results.values())
+        plot_widget.addItem(PlotDataItem(thread_counts, throughputs,
+                                         pen=mkPen(width=2), symbol='o'))
+        # Linear scaling from one thread for comparison
+        ideal = [throughputs[0] * n / thread_counts[0]
+                 for n in thread_counts]
+        plot_widget.addItem(PlotDataItem(thread_counts, ideal,
+                                         pen=mkPen(style=Qt.DashLine)))
+        layout.addWidget(plot_widget)
+        layout.addWidget(QLabel(', '.join(
+            [f'{n}: {tp / 1e6:.1f} MB/s ({tp / throughputs[0]:.1f}x)'
+             for n, tp in self.results.items()])))
+        self.setLayout(layout)
+
+
 def _show_error_msg(parent):
     exctype, value = sys.exc_info()[:2]
     traceback_str = traceback.format_exc(limit=-5)
@@ -399,6 +642,10 @@ class BenchmarkWindow(QMainWindow):
         self.statusBar().addPermanentWidget(self.startup_status)
         self.fps_status = QLabel()
         self.statusBar().addPermanentWidget(self.fps_status)
+        self.cache_status = QLabel()
+        self.statusBar().addPermanentWidget(self.cache_status)
+        self.update_status = QLabel()
+        self.statusBar().addPermanentWidget(self.update_status)
 
         self.load_backend()
 
@@ -513,6 +760,9 @@ class BenchmarkWindow(QMainWindow):
         return ica
 
     def load_backend(self):
+        # Stop a running preload before the backend is removed.
+        if hasattr(getattr(self, 'backend', None), 'cancel_preload'):
+            self.backend.cancel_preload()
         # Remove existing backend
         if self.centralWidget() is not None:
             widget = self.takeCentralWidget()
@@ -565,6 +815,8 @@ class BenchmarkWindow(QMainWindow):
         self.startup_status.setText(f'Startup: '
                                     f'{self.backend_startup_time:.3f} s')
         self.fps_status.setText('')
+        self.cache_status.setText('')
+        self.update_status.setText('')
 
         if self.current_backend == 'matplotlib':
             canvas = FigureCanvasQTAgg(self.backend)
@@ -650,6 +902,34 @@ class BenchmarkWindow(QMainWindow):
         afake_keypress.triggered.connect(partial(FakeKeyPressDialog, self))
         self.toolbar.addAction(afake_keypress)
 
+        akernel_bm = QAction('Kernel-Benchmark', parent=self)
+        akernel_bm.triggered.connect(partial(KernelDialog, self))
+        self.toolbar.addAction(akernel_bm)
+
+        ads_method_bm = QAction('DS-Method-Benchmark', parent=self)
+        ads_method_bm.triggered.connect(partial(DsMethodDialog, self))
+        self.toolbar.addAction(ads_method_bm)
+
+        apreload_bm = QAction('Preload-Scaling', parent=self)
+        apreload_bm.triggered.connect(self.show_preload_scaling)
+        self.toolbar.addAction(apreload_bm)
+
+    def show_preload_scaling(self):
+        backend = getattr(self, 'backend', None)
+        if not hasattr(backend, '_load_processed') \
+                or backend.mne.is_epochs:
+            QMessageBox.information(self, 'Not available!',
+                                    'The preload-scaling is only available '
+                                    'for raw-data with the pyqtgraph-'
+                                    'backend.')
+            return
+        if getattr(backend.mne, 'load_runner', None) is not None:
+            # The threads would compete with the running preload.
+            QMessageBox.information(self, 'Not available!',
+                                    'Wait until the preload is finished.')
+            return
+        PreloadScalingDialog(self)
+
     def open_file(self):
         file_path = QFileDialog.getOpenFileName(self,
                                                 'Open a file which is '
@@ -694,6 +974,90 @@ class BenchmarkWindow(QMainWindow):
             if self.bm_run:
                 self.benchmark_results[self.bm_run]['fps'].append(self.fps)
 
+    def get_cache_stats(self):
+        """Get hits/misses/evictions of the downsampling-cache."""
+        mne_params = getattr(self.backend, 'mne', None)
+        ds_cache = getattr(mne_params, 'ds_cache', None)
+        if ds_cache is None:
+            return None
+        return ds_cache.get_stats()
+
+    def show_cache_stats(self):
+        stats = self.get_cache_stats()
+        status_text = ''
+        if stats is not None:
+            status_text += (f'DS-Cache: '
+                            f'{stats["hits"]} hits, '
+                            f'{stats["misses"]} misses, '
+                            f'{stats["evictions"]} evictions, '
+                            f'{stats["nbytes"] / 1e6:.1f} MB')
+        # Tiles of render_mode='tiles'
+        mne_params = getattr(self.backend, 'mne', None)
+        tile_cache = getattr(getattr(mne_params, 'batch_item', None),
+                             'tile_cache', None)
+        if tile_cache is not None:
+            tile_stats = tile_cache.get_stats()
+            status_text += (f' | Tiles: {tile_stats["hits"]} hits, '
+                            f'{tile_stats["misses"]} misses')
+        preload_stats = self.get_preload_stats()
+        if preload_stats is not None:
+            status_text += (f' | Preload: {preload_stats["mode"]}, '
+                            f'{preload_stats["mb"]} MB')
+            if 'ratio' in preload_stats:
+                status_text += (f', ratio {preload_stats["ratio"]}, '
+                                f'{preload_stats["decompress_mb_s"]} MB/s')
+        self.cache_status.setText(status_text)
+
+    def get_preload_stats(self):
+        """Get the memory of the preloaded data (and its compression)."""
+        mne_params = getattr(self.backend, 'mne', None)
+        if getattr(mne_params, 'preload_window', False):
+            # The resident blocks of preload_mode='window'
+            return dict(mode='window',
+                        mb=round(mne_params.block_cache.nbytes / 1e6, 1))
+        data = getattr(mne_params, 'global_data', None)
+        if data is None:
+            return None
+        preload_stats = dict(mode=mne_params.preload_mode,
+                             mb=round(data.nbytes / 1e6, 1))
+        # The estimated memory of all components (see max_ram)
+        preload_plan = getattr(mne_params, 'preload_plan', None)
+        if preload_plan is not None:
+            preload_stats['plan_mb'] = preload_plan['total_mb']
+        # Compression-ratio and decompression-throughput of
+        # preload_mode='compressed'
+        if hasattr(data, 'get_stats'):
+            compression_stats = data.get_stats()
+            preload_stats['ratio'] = compression_stats['ratio']
+            preload_stats['decompress_mb_s'] = \
+                compression_stats['decompress_mb_s']
+        return preload_stats
+
+    def get_update_counts(self):
+        """Get requested/coalesced/applied updates of the view-range."""
+        mne_params = getattr(self.backend, 'mne', None)
+        update_counts = getattr(mne_params, 'update_counts', None)
+        if update_counts is None:
+            return None
+        update_counts = update_counts.copy()
+        # Latency of asynchronous updates (see async_update)
+        latencies = mne_params.update_latencies
+        if len(latencies) > 0:
+            update_counts['latency_ms'] = round(np.mean(latencies) * 1e3, 2)
+            update_counts['max_latency_ms'] = round(np.max(latencies) * 1e3,
+                                                    2)
+        return update_counts
+
+    def show_update_counts(self):
+        counts = self.get_update_counts()
+        if counts is not None:
+            status_text = (f'Updates: {counts["applied"]} applied, '
+                           f'{counts["coalesced"]} coalesced, '
+                           f'{counts["stale"]} stale')
+            if 'latency_ms' in counts:
+                status_text += f', latency {counts["latency_ms"]} ms'
+            self.update_status.setText(status_text)
+
     def get_n_limit(self):
         n = self.nbem_spinbox.value()
         if n == 0:
@@ -704,6 +1068,12 @@ class BenchmarkWindow(QMainWindow):
         if self.n_bm >= self.get_n_limit():
             self.bm_timer.stop()
             if self.bm_run:
+                self.benchmark_results[self.bm_run]['ds_cache'] = \
+                    self.get_cache_stats()
+                self.benchmark_results[self.bm_run]['updates'] = \
+                    self.get_update_counts()
+                self.benchmark_results[self.bm_run]['preload'] = \
+                    self.get_preload_stats()
                 self.finishedRun.emit('multi')
             else:
                 self.finishedRun.emit('single')
@@ -715,6 +1085,8 @@ class BenchmarkWindow(QMainWindow):
         def wrapper(self, *args, **kwargs):
             func(self, *args, **kwargs)
             self.show_fps()
+            self.show_cache_stats()
+            self.show_update_counts()
             self.check_break()
 
         return wrapper
@@ -830,5 +1202,7 @@ class BenchmarkWindow(QMainWindow):
 
     def closeEvent(self, event):
         event.accept()
+        if hasattr(self.backend, 'cancel_preload'):
+            self.backend.cancel_preload()
         self.backend._close(event)
         self.save_inst(None)
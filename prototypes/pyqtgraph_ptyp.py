@@ -4,13 +4,21 @@ IN MNE-PYTHON (currently https://github.com/mne-tools/mne-python/pull/9687)
 """
 
 import datetime
-import math
+import hashlib
+import json
+import os
 import platform
+import shutil
+import tempfile
+from collections import OrderedDict
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from functools import partial
+from threading import Event, Lock
+from time import perf_counter
 
 import numpy as np
 from PyQt5.QtCore import (QEvent, QPointF, Qt, pyqtSignal, QRunnable,
-                          QObject, QThreadPool, QRectF)
+                          QObject, QThreadPool, QRectF, QTimer, QThread)
 from PyQt5.QtGui import (QFont, QIcon, QPixmap, QTransform,
                          QMouseEvent, QPainter, QImage, QPen)
 from PyQt5.QtTest import QTest
@@ -23,15 +31,22 @@ from PyQt5.QtWidgets import (QAction, QColorDialog, QComboBox, QDialog,
                              QApplication, QGraphicsView, QProgressBar,
                              QVBoxLayout, QLineEdit, QCheckBox, QScrollArea)
 from mne.annotations import _sync_onset
+from mne.filter import estimate_ringing_samples
 from mne.io.pick import _DATA_CH_TYPES_ORDER_DEFAULT
 from mne.utils import logger
 from mne.viz._figure import BrowserBase
-from pyqtgraph import (AxisItem, GraphicsView, InfLineLabel, InfiniteLine,
-                       LinearRegionItem,
+from pyqtgraph import (AxisItem, GraphicsObject, GraphicsView, InfLineLabel,
+                       InfiniteLine, LinearRegionItem,
                        PlotCurveItem, PlotItem, TextItem, ViewBox, functions,
                        mkBrush, mkPen, setConfigOption, mkQApp, mkColor)
 from scipy.stats import zscore
 
+try:
+    from numba import njit, prange
+    has_numba = True
+except ImportError:
+    has_numba = False
+
 name = 'pyqtgraph'
 
 
@@ -54,6 +69,8 @@ class RawTraceItem(PlotCurveItem):
             self.setPen(self.mne.ch_color_bad)
         else:
             self.setPen(self.color)
+        if self.mne.batch_item is not None:
+            self.mne.batch_item.invalidate()
 
     def set_ch_idx(self, ch_idx):
         self.ch_idx = ch_idx
@@ -89,9 +106,23 @@ class RawTraceItem(PlotCurveItem):
         else:
             times = self.mne.times
 
-        self.setData(times, data, connect=connect, skipFiniteCheck=skip)
+        # Some downsampling-methods (e.g. lttb) select different times
+        # for each channel.
+        if times.ndim == 2:
+            if self.mne.data_preloaded:
+                times = times[self.order_idx]
+            else:
+                times = times[self.pick_idx]
 
-        self.setPos(0, self.ypos)
+        if self.mne.batch_item is not None:
+            # The trace is drawn together with the others
+            # by the BatchedTraceItem.
+            self.xData, self.yData = times, data
+            self.mne.batch_item.data_changed()
+        else:
+            self.setData(times, data, connect=connect, skipFiniteCheck=skip)
+
+            self.setPos(0, self.ypos)
 
     def mouseClickEvent(self, ev):
         if not self.clickable or ev.button() != Qt.MouseButton.LeftButton:
@@ -112,6 +143,305 @@ class RawTraceItem(PlotCurveItem):
         return self.yData + self.ypos
 
 
+class BatchedTraceItem(GraphicsObject):
+    """Graphics-Object drawing all traces in one paint-call.
+
+    The RawTraceItems are not added to the scene in this mode, but still
+    hold the data and properties of each channel. The traces are joined
+    into one path per pen with the offsets and the scaling applied
+    to the y-values.
+    """
+
+    def __init__(self, mne):
+        super().__init__()
+        self.mne = mne
+        self._paths = None
+        self._bounds = QRectF()
+
+    def invalidate(self):
+        """Rebuild the paths at the next paint."""
+        if self._paths is not None:
+            self._paths = None
+            self.prepareGeometryChange()
+            self.update()
+
+    def data_changed(self):
+        """Draw the changed data of the traces."""
+        self.invalidate()
+
+    def _build_paths(self):
+        pen_groups = dict()
+        for trace in self.mne.traces:
+            if trace.xData is None or len(trace.xData) == 0:
+                continue
+            pen = mkPen(self.mne.ch_color_bad if trace.isbad
+                        else trace.color)
+            key = pen.color().rgba()
+            pen_groups.setdefault(key, (pen, list()))[1].append(trace)
+
+        self._paths = list()
+        self._bounds = QRectF()
+        for pen, traces in pen_groups.values():
+            x = np.concatenate([tr.xData for tr in traces])
+            y = np.concatenate([tr.yData * self.mne.scale_factor + tr.ypos
+                                for tr in traces])
+            # Don't connect the last point of a trace to the next trace.
+            connect = np.ones(len(x), dtype=np.int32)
+            connect[np.cumsum([len(tr.xData) for tr in traces]) - 1] = 0
+            if self.mne.check_nan:
+                nan_mask = ~np.isfinite(y)
+                if np.any(nan_mask):
+                    connect[nan_mask] = 0
+                    connect[np.roll(nan_mask, -1)] = 0
+                    y[nan_mask] = 0
+            path = functions.arrayToQPath(x, y, connect=connect)
+            self._paths.append((pen, path))
+            self._bounds = self._bounds.united(path.boundingRect())
+
+    def boundingRect(self):
+        if self._paths is None:
+            self._build_paths()
+        return self._bounds
+
+    def paint(self, p, *args):
+        if self._paths is None:
+            self._build_paths()
+        if self.mne.antialiasing:
+            p.setRenderHint(QPainter.Antialiasing)
+        for pen, path in self._paths:
+            p.setPen(pen)
+            p.drawPath(path)
+
+    def mouseClickEvent(self, ev):
+        if ev.button() != Qt.MouseButton.LeftButton:
+            ev.ignore()
+            return
+        # Find the trace closest to the click (at most 5 pixels away).
+        pos = ev.pos()
+        max_dist = 5 * self.pixelHeight()
+        hit_trace = None
+        for trace in self.mne.traces:
+            if trace.xData is None or len(trace.xData) == 0:
+                continue
+            y = np.interp(pos.x(), trace.xData, trace.yData)
+            dist = abs(y * self.mne.scale_factor + trace.ypos - pos.y())
+            if dist < max_dist:
+                max_dist = dist
+                hit_trace = trace
+        if hit_trace is None:
+            ev.ignore()
+            return
+        ev.accept()
+        hit_trace.isbad = not hit_trace.isbad
+        hit_trace.update_bad_color()
+        hit_trace.sigClicked.emit(hit_trace, ev)
+
+
+class TileTraceItem(BatchedTraceItem):
+    """Graphics-Object drawing the traces from cached tiles.
+
+    Each tile is an image of tile_width pixels of one channel, which is
+    reused while scrolling at a fixed zoom, thus only newly exposed tiles
+    are rendered. The tiles are cached per zoom, downsampling-factor,
+    scaling, processing-state, pen and position. The DC-offset of the
+    visible window is applied when the tiles are drawn.
+    Tiles are only used for preloaded data outside of butterfly-mode,
+    otherwise the traces are drawn like by the BatchedTraceItem.
+    With render_threads, missing tiles are rendered in bands of channels
+    on a thread-pool and drawn as soon as they are finished.
+    """
+    # A tile covers this many channel-heights above and below its channel.
+    margin = 2
+
+    def __init__(self, browser):
+        super().__init__(browser.mne)
+        self.browser = browser
+        self.tile_cache = LRUCache(self.mne.tile_cache_mb * 1e6)
+        # Keys of tiles, which are currently rendered in a thread.
+        self.pending_tiles = set()
+        n_threads = self.mne.render_threads
+        if n_threads == -1:
+            n_threads = QThread.idealThreadCount()
+        if n_threads > 0:
+            self.render_pool = QThreadPool()
+            self.render_pool.setMaxThreadCount(n_threads)
+        else:
+            self.render_pool = None
+
+    def _use_tiles(self):
+        return self.mne.data_preloaded and not self.mne.butterfly
+
+    def invalidate(self):
+        if self._use_tiles():
+            # The tiles for changed properties are not found in the cache.
+            self._paths = None
+            self.prepareGeometryChange()
+            self.update()
+        else:
+            super().invalidate()
+
+    def boundingRect(self):
+        if self._use_tiles():
+            return QRectF(0, 0, self.mne.xmax, self.mne.ymax)
+        return super().boundingRect()
+
+    def _get_visible_dc(self, rows):
+        start, stop = self.browser._get_start_stop()
+        pyramid = self.mne.ds_pyramid
+        if pyramid is not None:
+            dc = pyramid.get_mean(self.mne.global_data, start, stop)[rows]
+        else:
+            dc = np.asarray(
+                self.mne.global_data[rows, start:stop]).mean(axis=1)
+        return self.browser._dequantize(dc[:, np.newaxis], rows=rows)[:, 0]
+
+    def _render_tile(self, times, data, t0, tile_dur, px_h, pen,
+                     scale_factor):
+        """Rasterize the data of one channel into an image.
+
+        Only the arguments are used, thus this can run in a separate thread.
+        """
+        width = self.mne.tile_width
+        height = int(np.ceil(2 * self.margin / px_h))
+        image = QImage(width, height, QImage.Format_ARGB32_Premultiplied)
+        image.fill(Qt.transparent)
+        # The tile is centered around the mean of its data to have the
+        # trace inside the margins after applying the DC-offset.
+        dc = np.nanmean(data) if len(data) > 0 else 0.
+        if not np.isfinite(dc):
+            dc = 0.
+        x = (times - t0) / tile_dur * width
+        y = (data - dc) * scale_factor / px_h + height / 2
+        connect = 'finite' if self.mne.check_nan else 'all'
+        path = functions.arrayToQPath(x, y, connect=connect)
+        painter = QPainter(image)
+        if self.mne.antialiasing:
+            painter.setRenderHint(QPainter.Antialiasing)
+        painter.setPen(pen)
+        painter.drawPath(path)
+        painter.end()
+
+        return image, dc
+
+    def _render_tiles(self, tile_params, keys, rows, pens):
+        """Render and cache the tiles of one tile-index for some channels."""
+        global_times, global_data, start, stop, t0, tile_dur, px_h, view = \
+            tile_params
+        times = global_times[start:stop]
+        data = global_data[rows, start:stop]
+        times, data = self.browser._apply_downsampling(times, data, view)
+        data = self.browser._dequantize(data, rows=rows)
+        tiles = list()
+        for idx, (key, pen) in enumerate(zip(keys, pens)):
+            # Some downsampling-methods select different times per channel.
+            channel_times = times[idx] if times.ndim == 2 else times
+            tile = self._render_tile(channel_times, data[idx], t0, tile_dur,
+                                     px_h, pen, view['scale_factor'])
+            self.tile_cache.put(key, tile)
+            self.pending_tiles.discard(key)
+            tiles.append(tile)
+
+        return tiles
+
+    def _request_tiles(self, tile_params, keys, rows, pens):
+        """Render the tiles in bands of channels on the thread-pool."""
+        n_bands = min(self.render_pool.maxThreadCount(), len(keys))
+        for band in np.array_split(np.arange(len(keys)), n_bands):
+            band_keys = [keys[idx] for idx in band]
+            self.pending_tiles.update(band_keys)
+            tile_runner = TileRunner(self, tile_params, band_keys,
+                                     rows[band], [pens[idx] for idx in band])
+            tile_runner.sigs.tilesReady.connect(self.update)
+            self.render_pool.start(tile_runner)
+
+    def paint(self, p, *args):
+        if not self._use_tiles():
+            super().paint(p, *args)
+            return
+        px_w, px_h = self.pixelWidth(), self.pixelHeight()
+        traces = [tr for tr in self.mne.traces if tr.xData is not None]
+        if px_w == 0 or px_h == 0 or len(traces) == 0:
+            return
+        tile_dur = self.mne.tile_width * px_w
+        ds = self.browser._get_ds_factor()
+        zoom_key = (round(tile_dur, 12), round(px_h, 12), ds,
+                    self.mne.ds_method, self.mne.scale_factor,
+                    self.mne.processing_generation)
+        rows = np.array([tr.order_idx for tr in traces])
+        pens = [mkPen(self.mne.ch_color_bad if tr.isbad else tr.color)
+                for tr in traces]
+        if self.mne.remove_dc:
+            visible_dc = self._get_visible_dc(rows)
+        else:
+            visible_dc = np.zeros(len(traces))
+        sfreq = self.mne.info['sfreq']
+        n_times = self.mne.global_data.shape[1]
+        first_tile = int(self.mne.t_start // tile_dur)
+        last_tile = int((self.mne.t_start + self.mne.duration) // tile_dur)
+        if self.mne.antialiasing:
+            p.setRenderHint(QPainter.Antialiasing)
+        for tile_idx in range(first_tile, last_tile + 1):
+            t0 = tile_idx * tile_dur
+            keys = [zoom_key + (tile_idx, tr.order_idx, pen.color().rgba())
+                    for tr, pen in zip(traces, pens)]
+            tiles = [self.tile_cache.get(key) for key in keys]
+            missing = [idx for idx, tile in enumerate(tiles) if tile is None
+                       and keys[idx] not in self.pending_tiles]
+            if len(missing) > 0:
+                # Load one more sample on both sides to connect the traces
+                # across the borders of the tiles.
+                start = max(int(np.floor(t0 * sfreq)) - 1, 0)
+                stop = min(int(np.ceil((t0 + tile_dur) * sfreq)) + 2,
+                           n_times)
+                if start >= stop:
+                    continue
+                view = dict(ds=ds, ds_method=self.mne.ds_method,
+                            scale_factor=self.mne.scale_factor, start=start)
+                tile_params = (self.mne.global_times, self.mne.global_data,
+                               start, stop, t0, tile_dur, px_h, view)
+                missing_keys = [keys[idx] for idx in missing]
+                missing_pens = [pens[idx] for idx in missing]
+                if self.render_pool is None:
+                    rendered = self._render_tiles(tile_params, missing_keys,
+                                                  rows[missing], missing_pens)
+                    for idx, tile in zip(missing, rendered):
+                        tiles[idx] = tile
+                else:
+                    # The tiles are drawn when they are finished.
+                    self._request_tiles(tile_params, missing_keys,
+                                        rows[missing], missing_pens)
+            for trace, tile, vis_dc in zip(traces, tiles, visible_dc):
+                if tile is None:
+                    continue
+                image, dc = tile
+                height = image.height() * px_h
+                center = trace.ypos + (dc - vis_dc) * self.mne.scale_factor
+                p.drawImage(QRectF(t0, center - height / 2,
+                                   tile_dur, height), image)
+
+
+class TileRunnerSignals(QObject):
+    tilesReady = pyqtSignal()
+
+
+class TileRunner(QRunnable):
+    """Render tiles of a band of channels in a separate QThread."""
+
+    def __init__(self, item, tile_params, keys, rows, pens):
+        super().__init__()
+        self.item = item
+        self.tile_params = tile_params
+        self.keys = keys
+        self.rows = rows
+        self.pens = pens
+        self.sigs = TileRunnerSignals()
+
+    def run(self):
+        self.item._render_tiles(self.tile_params, self.keys, self.rows,
+                                self.pens)
+        self.sigs.tilesReady.emit()
+
+
 class TimeAxis(AxisItem):
     """The X-Axis displaying the time."""
 
@@ -1046,10 +1376,1103 @@ class BrowserView(GraphicsView):
         self.sigSceneMouseMoved.emit(ev.pos())
 
 
+# Kernels for downsampling and the z-score overview. Every kernel takes the
+# data of the visible window and returns a new float64-array.
+# The downsampling-kernels remove the DC-offset of the window (with the mean
+# of all its samples) in the same pass if requested.
+def _subsample_numpy(data, ds, remove_dc):
+    data = np.asarray(data)
+    out = data[:, ::ds].astype(np.float64)
+    if remove_dc:
+        out -= data.mean(axis=1, keepdims=True)
+
+    return out
+
+
+def _mean_numpy(data, ds, remove_dc):
+    data = np.asarray(data)
+    n_ch = data.shape[0]
+    n = data.shape[1] // ds
+    out = data[:, :n * ds].reshape((n_ch, n, ds)).mean(axis=2)
+    if remove_dc:
+        out -= data.mean(axis=1, keepdims=True)
+
+    return out
+
+
+def _peak_numpy(data, ds, remove_dc):
+    data = np.asarray(data)
+    n_ch = data.shape[0]
+    n = data.shape[1] // ds
+    rs_data = data[:, :n * ds].reshape((n_ch, n, ds))
+    out = np.empty((n_ch, n, 2))
+    out[:, :, 0] = rs_data.max(axis=2)
+    out[:, :, 1] = rs_data.min(axis=2)
+    if remove_dc:
+        out -= data.mean(axis=1)[:, np.newaxis, np.newaxis]
+
+    return out.reshape((n_ch, n * 2))
+
+
+def _m4_numpy(data, ds, remove_dc):
+    data = np.asarray(data)
+    n_ch = data.shape[0]
+    n = data.shape[1] // ds
+    rs_data = data[:, :n * ds].reshape((n_ch, n, ds))
+    out = np.empty((n_ch, n, 4))
+    out[:, :, 0] = rs_data[:, :, 0]
+    out[:, :, 3] = rs_data[:, :, -1]
+    argmin = rs_data.argmin(axis=2)
+    argmax = rs_data.argmax(axis=2)
+    bin_min = np.take_along_axis(rs_data, argmin[..., np.newaxis], 2)[..., 0]
+    bin_max = np.take_along_axis(rs_data, argmax[..., np.newaxis], 2)[..., 0]
+    # Keep the order in which minimum and maximum occur in the bin.
+    min_first = argmin <= argmax
+    out[:, :, 1] = np.where(min_first, bin_min, bin_max)
+    out[:, :, 2] = np.where(min_first, bin_max, bin_min)
+    if remove_dc:
+        out -= data.mean(axis=1)[:, np.newaxis, np.newaxis]
+
+    return out.reshape((n_ch, n * 4))
+
+
+def _lttb_numpy(data, ds, remove_dc):
+    """Largest-Triangle-Three-Buckets with one point per bin.
+
+    Returns the selected values and their sample-indices.
+    """
+    data = np.asarray(data)
+    n_ch = data.shape[0]
+    n = data.shape[1] // ds
+    rs_data = data[:, :n * ds].reshape((n_ch, n, ds))
+    out = np.empty((n_ch, n))
+    idxs = np.empty((n_ch, n), dtype=np.int64)
+    if n > 0:
+        # The average of the next bin is the third point of the triangle.
+        bin_means = rs_data.mean(axis=2)
+        ch_idxs = np.arange(n_ch)
+        xa = np.zeros(n_ch)
+        # As float to avoid overflows with integer data.
+        ya = rs_data[:, 0, 0].astype(np.float64)
+        for b in range(n):
+            if b < n - 1:
+                xc = (b + 1) * ds + (ds - 1) / 2
+                yc = bin_means[:, b + 1]
+            else:
+                xc = n * ds - 1
+                yc = rs_data[:, -1, -1]
+            xb = b * ds + np.arange(ds)
+            yb = rs_data[:, b]
+            area = np.abs((xa - xc)[:, np.newaxis] * (yb - ya[:, np.newaxis])
+                          - (xa[:, np.newaxis] - xb)
+                          * (yc - ya)[:, np.newaxis])
+            selected = area.argmax(axis=1)
+            out[:, b] = yb[ch_idxs, selected]
+            idxs[:, b] = b * ds + selected
+            xa = idxs[:, b].astype(np.float64)
+            ya = out[:, b]
+    if remove_dc:
+        out -= data.mean(axis=1)[:, np.newaxis]
+
+    return out, idxs
+
+
+def _column_means_numpy(data, n_cols, collapse_by):
+    data = np.asarray(data[:, :n_cols * collapse_by])
+
+    return data.reshape((data.shape[0], n_cols, collapse_by)).mean(axis=2)
+
+
+_numpy_kernels = dict(subsample=_subsample_numpy,
+                      mean=_mean_numpy,
+                      peak=_peak_numpy,
+                      m4=_m4_numpy,
+                      lttb=_lttb_numpy,
+                      column_means=_column_means_numpy)
+
+if has_numba:
+    # The compiled kernels do the same as the NumPy-kernels above in one
+    # pass over the data without temporary arrays. They run in parallel
+    # over channels and release the GIL.
+    @njit(parallel=True, nogil=True, cache=True)
+    def _subsample_numba(data, ds, remove_dc):
+        n_ch, n_times = data.shape
+        n = -(-n_times // ds)
+        out = np.empty((n_ch, n))
+        for ch in prange(n_ch):
+            offset = 0.
+            if remove_dc:
+                total = 0.
+                for i in range(n_times):
+                    total += data[ch, i]
+                offset = total / n_times
+            for j in range(n):
+                out[ch, j] = data[ch, j * ds] - offset
+
+        return out
+
+    @njit(parallel=True, nogil=True, cache=True)
+    def _mean_numba(data, ds, remove_dc):
+        n_ch, n_times = data.shape
+        n = n_times // ds
+        out = np.empty((n_ch, n))
+        for ch in prange(n_ch):
+            total = 0.
+            for b in range(n):
+                bin_sum = 0.
+                for i in range(b * ds, (b + 1) * ds):
+                    bin_sum += data[ch, i]
+                total += bin_sum
+                out[ch, b] = bin_sum / ds
+            for i in range(n * ds, n_times):
+                total += data[ch, i]
+            offset = total / n_times if remove_dc else 0.
+            for b in range(n):
+                out[ch, b] -= offset
+
+        return out
+
+    @njit(parallel=True, nogil=True, cache=True)
+    def _peak_numba(data, ds, remove_dc):
+        n_ch, n_times = data.shape
+        n = n_times // ds
+        out = np.empty((n_ch, n * 2))
+        for ch in prange(n_ch):
+            total = 0.
+            for b in range(n):
+                bin_max = -np.inf
+                bin_min = np.inf
+                for i in range(b * ds, (b + 1) * ds):
+                    value = data[ch, i]
+                    total += value
+                    if value > bin_max:
+                        bin_max = value
+                    if value < bin_min:
+                        bin_min = value
+                out[ch, 2 * b] = bin_max
+                out[ch, 2 * b + 1] = bin_min
+            if remove_dc:
+                for i in range(n * ds, n_times):
+                    total += data[ch, i]
+                offset = total / n_times
+                for j in range(n * 2):
+                    out[ch, j] -= offset
+
+        return out
+
+    @njit(parallel=True, nogil=True, cache=True)
+    def _m4_numba(data, ds, remove_dc):
+        n_ch, n_times = data.shape
+        n = n_times // ds
+        out = np.empty((n_ch, n * 4))
+        for ch in prange(n_ch):
+            total = 0.
+            for b in range(n):
+                i_min = b * ds
+                i_max = b * ds
+                for i in range(b * ds, (b + 1) * ds):
+                    value = data[ch, i]
+                    total += value
+                    if value < data[ch, i_min]:
+                        i_min = i
+                    if value > data[ch, i_max]:
+                        i_max = i
+                out[ch, 4 * b] = data[ch, b * ds]
+                out[ch, 4 * b + 1] = data[ch, min(i_min, i_max)]
+                out[ch, 4 * b + 2] = data[ch, max(i_min, i_max)]
+                out[ch, 4 * b + 3] = data[ch, (b + 1) * ds - 1]
+            offset = 0.
+            if remove_dc:
+                for i in range(n * ds, n_times):
+                    total += data[ch, i]
+                offset = total / n_times
+            for j in range(n * 4):
+                out[ch, j] -= offset
+
+        return out
+
+    @njit(parallel=True, nogil=True, cache=True)
+    def _lttb_numba(data, ds, remove_dc):
+        n_ch, n_times = data.shape
+        n = n_times // ds
+        out = np.empty((n_ch, n))
+        idxs = np.empty((n_ch, n), dtype=np.int64)
+        for ch in prange(n_ch):
+            total = 0.
+            xa = 0.
+            ya = data[ch, 0]
+            for b in range(n):
+                if b < n - 1:
+                    yc = 0.
+                    for i in range((b + 1) * ds, (b + 2) * ds):
+                        yc += data[ch, i]
+                    yc /= ds
+                    xc = (b + 1) * ds + (ds - 1) / 2
+                else:
+                    xc = n * ds - 1.
+                    yc = data[ch, n * ds - 1]
+                max_area = -1.
+                selected = b * ds
+                for i in range(b * ds, (b + 1) * ds):
+                    value = data[ch, i]
+                    total += value
+                    area = abs((xa - xc) * (value - ya)
+                               - (xa - i) * (yc - ya))
+                    if area > max_area:
+                        max_area = area
+                        selected = i
+                out[ch, b] = data[ch, selected]
+                idxs[ch, b] = selected
+                xa = float(selected)
+                ya = data[ch, selected]
+            offset = 0.
+            if remove_dc:
+                for i in range(n * ds, n_times):
+                    total += data[ch, i]
+                offset = total / n_times
+            for b in range(n):
+                out[ch, b] -= offset
+
+        return out, idxs
+
+    @njit(parallel=True, nogil=True, cache=True)
+    def _column_means_numba(data, n_cols, collapse_by):
+        n_ch = data.shape[0]
+        out = np.empty((n_ch, n_cols))
+        for ch in prange(n_ch):
+            for c in range(n_cols):
+                col_sum = 0.
+                for i in range(c * collapse_by, (c + 1) * collapse_by):
+                    col_sum += data[ch, i]
+                out[ch, c] = col_sum / collapse_by
+
+        return out
+
+    _numba_kernels = dict(subsample=_subsample_numba,
+                          mean=_mean_numba,
+                          peak=_peak_numba,
+                          m4=_m4_numba,
+                          lttb=_lttb_numba,
+                          column_means=_column_means_numba)
+
+
+def _get_kernels(use_numba=True):
+    """Get the compiled kernels if numba is installed, else NumPy."""
+    if use_numba and has_numba:
+        return _numba_kernels
+    else:
+        return _numpy_kernels
+
+
+def _get_nbytes(value):
+    """Get the size of arrays or images (or tuples of them) in bytes."""
+    if isinstance(value, tuple):
+        return sum([_get_nbytes(v) for v in value])
+    elif isinstance(value, QImage):
+        return value.sizeInBytes()
+    else:
+        return getattr(value, 'nbytes', 0)
+
+
+class LRUCache:
+    """Cache with a memory-budget for arrays (or tuples of arrays).
+
+    If the budget is exceeded, the least recently used entries are evicted
+    first. The cache can be accessed from multiple threads.
+    """
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = Lock()
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._entries
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        """Get the value of key or None if it is not cached."""
+        with self._lock:
+            if key not in self._entries:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return self._entries[key][0]
+
+    def put(self, key, value):
+        nbytes = _get_nbytes(value)
+        with self._lock:
+            if key in self._entries:
+                self.nbytes -= self._entries.pop(key)[1]
+            # Values larger than the whole budget are not cached.
+            if nbytes > self.max_bytes:
+                return
+            self._entries[key] = (value, nbytes)
+            self.nbytes += nbytes
+            while self.nbytes > self.max_bytes:
+                _, (_, evicted_nbytes) = self._entries.popitem(last=False)
+                self.nbytes -= evicted_nbytes
+                self.evictions += 1
+
+    def keys(self):
+        with self._lock:
+            return list(self._entries)
+
+    def pop(self, key):
+        """Remove key (if it is cached)."""
+        with self._lock:
+            if key in self._entries:
+                self.nbytes -= self._entries.pop(key)[1]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.nbytes = 0
+
+    def get_stats(self):
+        return dict(hits=self.hits, misses=self.misses,
+                    evictions=self.evictions, entries=len(self),
+                    nbytes=self.nbytes)
+
+
+class MinMaxPyramid:
+    """Per-channel minima/maxima of the data for power-of-two bin-sizes.
+
+    Level k holds the minimum and maximum of consecutive bins of 2 ** k
+    samples (anchored at sample 0). The lowest level is computed from the
+    data and every other level from the level below, so the whole pyramid
+    needs about 4 / 2 ** min_level of the memory of the data.
+    Additionally the cumulative sums of the lowest level are stored to get
+    the mean of a window without reading all its samples.
+    """
+
+    def __init__(self, data, min_level=3, chunk_size=2 ** 20):
+        self.min_level = min_level
+        self.min_ds = 2 ** min_level
+        n_ch, self.n_times = data.shape
+        n_bins = -(-self.n_times // self.min_ds)
+        mins = np.empty((n_ch, n_bins), dtype=data.dtype)
+        maxs = np.empty((n_ch, n_bins), dtype=data.dtype)
+        sums = np.zeros((n_ch, n_bins + 1))
+
+        # Compute the lowest level in chunks to limit temporary memory.
+        chunk_size = max(1, chunk_size // self.min_ds) * self.min_ds
+        for start in range(0, self.n_times, chunk_size):
+            chunk = np.asarray(data[:, start:start + chunk_size])
+            bin_starts = np.arange(0, chunk.shape[1], self.min_ds)
+            b0 = start // self.min_ds
+            b1 = b0 + len(bin_starts)
+            mins[:, b0:b1] = np.minimum.reduceat(chunk, bin_starts, axis=1)
+            maxs[:, b0:b1] = np.maximum.reduceat(chunk, bin_starts, axis=1)
+            sums[:, b0 + 1:b1 + 1] = np.add.reduceat(chunk, bin_starts,
+                                                     axis=1)
+        self.cumsum = np.cumsum(sums, axis=1, out=sums)
+
+        self.levels = {min_level: (mins, maxs)}
+        level = min_level
+        while mins.shape[1] > 1:
+            pairs = np.arange(0, mins.shape[1], 2)
+            mins = np.minimum.reduceat(mins, pairs, axis=1)
+            maxs = np.maximum.reduceat(maxs, pairs, axis=1)
+            level += 1
+            self.levels[level] = (mins, maxs)
+        self.max_level = level
+
+    @property
+    def nbytes(self):
+        return self.cumsum.nbytes + sum([mins.nbytes + maxs.nbytes for
+                                         mins, maxs in self.levels.values()])
+
+    def get_arrays(self):
+        """Get the arrays of the pyramid (e.g. to store them on disk)."""
+        arrays = dict(cumsum=self.cumsum, n_times=np.array(self.n_times))
+        for level, (mins, maxs) in self.levels.items():
+            arrays[f'mins_{level}'] = mins
+            arrays[f'maxs_{level}'] = maxs
+
+        return arrays
+
+    @classmethod
+    def from_arrays(cls, arrays):
+        """Restore a pyramid from the arrays of get_arrays."""
+        pyramid = cls.__new__(cls)
+        levels = sorted([int(name[5:]) for name in arrays
+                         if name.startswith('mins_')])
+        pyramid.min_level = levels[0]
+        pyramid.max_level = levels[-1]
+        pyramid.min_ds = 2 ** pyramid.min_level
+        pyramid.n_times = int(arrays['n_times'])
+        pyramid.cumsum = arrays['cumsum']
+        pyramid.levels = {level: (arrays[f'mins_{level}'],
+                                  arrays[f'maxs_{level}'])
+                          for level in levels}
+
+        return pyramid
+
+    def get_window(self, start, stop, ds):
+        """Get the peaks of [start, stop) from the level closest to ds.
+
+        Returns the sample-indices of the bin-centers and the data
+        with maximum and minimum alternating for each bin
+        (as with ds_method='peak').
+        """
+        level = int(np.clip(round(np.log2(ds)),
+                            self.min_level, self.max_level))
+        bin_size = 2 ** level
+        mins, maxs = self.levels[level]
+        b0 = max(start, 0) // bin_size
+        b1 = min(-(-stop // bin_size), mins.shape[1])
+        n_bins = max(b1 - b0, 0)
+
+        data = np.empty((mins.shape[0], n_bins, 2), dtype=mins.dtype)
+        data[:, :, 0] = maxs[:, b0:b1]
+        data[:, :, 1] = mins[:, b0:b1]
+        centers = np.arange(b0, b0 + n_bins) * bin_size + bin_size // 2
+        idxs = np.repeat(np.minimum(centers, self.n_times - 1), 2)
+
+        return idxs, data.reshape((mins.shape[0], n_bins * 2))
+
+    def get_mean(self, data, start, stop):
+        """Get the mean of data in [start, stop) from the cumulative sums.
+
+        Only the samples of the partial bins at the edges are read from
+        data.
+        """
+        start = max(start, 0)
+        stop = min(stop, self.n_times)
+        b0 = -(-start // self.min_ds)
+        b1 = stop // self.min_ds
+        if b0 >= b1:
+            return np.asarray(data[:, start:stop]).mean(axis=1)
+        sums = self.cumsum[:, b1] - self.cumsum[:, b0]
+        sums += np.asarray(data[:, start:b0 * self.min_ds]).sum(axis=1)
+        sums += np.asarray(data[:, b1 * self.min_ds:stop]).sum(axis=1)
+
+        return sums / (stop - start)
+
+
+class ColumnMeans:
+    """Means of the data over columns of collapse_by samples.
+
+    The sums of the columns are accumulated from chunks of the data in
+    any order, thus the means are available as soon as all chunks were
+    added. Samples after the last full column are ignored.
+    """
+
+    def __init__(self, n_channels, n_times, n_cols):
+        self.n_cols = min(n_cols, n_times)
+        self.collapse_by = n_times // self.n_cols
+        self.sums = np.zeros((n_channels, self.n_cols))
+
+    def add(self, data, start):
+        """Add a chunk of data beginning at the sample start."""
+        stop = min(start + data.shape[1], self.n_cols * self.collapse_by)
+        if stop <= start:
+            return
+        first_col = start // self.collapse_by
+        # Offsets of the column-boundaries inside the chunk
+        bounds = np.arange((first_col + 1) * self.collapse_by - start,
+                           stop - start, self.collapse_by)
+        col_starts = np.concatenate([[0], bounds])
+        col_sums = np.add.reduceat(np.asarray(data[:, :stop - start]),
+                                   col_starts, axis=1)
+        self.sums[:, first_col:first_col + len(col_starts)] += col_sums
+
+    @property
+    def means(self):
+        return self.sums / self.collapse_by
+
+
+def _get_codec(codec, level, itemsize):
+    """Get the functions to compress and decompress bytes with a codec."""
+    if codec == 'zlib':
+        import zlib
+        return partial(zlib.compress, level=level), zlib.decompress
+    elif codec == 'lz4':
+        import lz4.frame
+        return (partial(lz4.frame.compress, compression_level=level),
+                lz4.frame.decompress)
+    elif codec == 'blosc':
+        import blosc
+        return (partial(blosc.compress, typesize=itemsize, clevel=level),
+                blosc.decompress)
+    else:
+        raise ValueError(f'The codec has to be one of "zlib", "lz4" or '
+                         f'"blosc", not {codec}.')
+
+
+class CompressedChunkStore:
+    """Data stored in memory as independently compressed chunks of time.
+
+    Chunks are compressed as soon as all their samples were written
+    (in any order, without overlaps). Indexing like data[rows, start:stop]
+    decompresses only the chunks overlapping the slice, the recently
+    used ones are kept decompressed in a hot cache. Written parts can be
+    read while other parts are written from another thread.
+    """
+    ndim = 2
+
+    def __init__(self, n_channels, n_times, dtype, chunk_size, codec='zlib',
+                 level=1, hot_cache_mb=50):
+        self.shape = (n_channels, n_times)
+        self.dtype = np.dtype(dtype)
+        self.chunk_size = chunk_size
+        self._compress, self._decompress = _get_codec(codec, level,
+                                                      self.dtype.itemsize)
+        self.chunks = [None] * -(-n_times // chunk_size)
+        # Chunks which are not completely written yet
+        self._pending = dict()
+        self.hot_cache = LRUCache(hot_cache_mb * 1e6)
+        self._lock = Lock()
+        self.compress_time = 0.
+        self.decompress_time = 0.
+        self.decompressed_bytes = 0
+
+    @property
+    def nbytes(self):
+        """The size of the compressed chunks."""
+        return sum([len(chunk) for chunk in self.chunks
+                    if chunk is not None])
+
+    @property
+    def raw_nbytes(self):
+        return self.shape[0] * self.shape[1] * self.dtype.itemsize
+
+    def _get_bounds(self, chunk_idx):
+        start = chunk_idx * self.chunk_size
+        return start, min(start + self.chunk_size, self.shape[1])
+
+    def write(self, start, data):
+        """Write data (of all channels) beginning at sample start."""
+        stop = start + data.shape[1]
+        for chunk_idx in range(start // self.chunk_size,
+                               (stop - 1) // self.chunk_size + 1):
+            c0, c1 = self._get_bounds(chunk_idx)
+            with self._lock:
+                if chunk_idx in self._pending:
+                    buffer, n_filled = self._pending[chunk_idx]
+                else:
+                    buffer, n_filled = np.empty((self.shape[0], c1 - c0),
+                                                dtype=self.dtype), 0
+                w0, w1 = max(start, c0), min(stop, c1)
+                buffer[:, w0 - c0:w1 - c0] = data[:, w0 - start:w1 - start]
+                n_filled += w1 - w0
+                self._pending[chunk_idx] = (buffer, n_filled)
+            if n_filled == c1 - c0:
+                t0 = perf_counter()
+                compressed = self._compress(buffer.tobytes())
+                self.compress_time += perf_counter() - t0
+                # Readers use the buffer until the chunk is available.
+                with self._lock:
+                    self.chunks[chunk_idx] = compressed
+                    del self._pending[chunk_idx]
+
+    def _get_chunk(self, chunk_idx):
+        chunk = self.hot_cache.get(chunk_idx)
+        if chunk is not None:
+            return chunk
+        with self._lock:
+            if chunk_idx in self._pending:
+                return self._pending[chunk_idx][0]
+            compressed = self.chunks[chunk_idx]
+        t0 = perf_counter()
+        chunk = np.frombuffer(self._decompress(compressed),
+                              dtype=self.dtype).reshape((self.shape[0], -1))
+        with self._lock:
+            self.decompress_time += perf_counter() - t0
+            self.decompressed_bytes += chunk.nbytes
+        self.hot_cache.put(chunk_idx, chunk)
+
+        return chunk
+
+    def __getitem__(self, key):
+        rows, cols = key
+        start, stop, step = cols.indices(self.shape[1])
+        if step != 1:
+            raise IndexError('Only contiguous slices of time are supported.')
+        stop = max(start, stop)
+        parts = list()
+        for chunk_idx in range(start // self.chunk_size,
+                               -(-stop // self.chunk_size)):
+            c0, c1 = self._get_bounds(chunk_idx)
+            parts.append(self._get_chunk(chunk_idx)[
+                rows, max(start, c0) - c0:min(stop, c1) - c0])
+        if len(parts) == 0:
+            return np.empty((self.shape[0], 0), dtype=self.dtype)[rows, :]
+
+        return np.concatenate(parts, axis=-1)
+
+    def get_stats(self):
+        """Get the compression-ratio and the decompression-throughput."""
+        nbytes = self.nbytes
+        if self.decompress_time > 0:
+            throughput = self.decompressed_bytes / self.decompress_time
+        else:
+            throughput = 0.
+        return dict(nbytes=nbytes,
+                    ratio=round(self.raw_nbytes / max(nbytes, 1), 2),
+                    decompress_mb_s=round(throughput / 1e6, 1),
+                    hot_cache=self.hot_cache.get_stats())
+
+
+def _hash_params(hasher, param):
+    """Update hasher with (nested) parameters including arrays."""
+    if isinstance(param, np.ndarray):
+        hasher.update(f'{param.dtype}{param.shape}'.encode())
+        hasher.update(np.ascontiguousarray(param).tobytes())
+    elif isinstance(param, dict):
+        for key in sorted(param, key=str):
+            hasher.update(str(key).encode())
+            _hash_params(hasher, param[key])
+    elif isinstance(param, (list, tuple)):
+        hasher.update(f'{type(param).__name__}{len(param)}'.encode())
+        for item in param:
+            _hash_params(hasher, item)
+    else:
+        hasher.update(repr(param).encode())
+
+
+def _save_array(fname, data, chunk_size=2 ** 20):
+    """Save 2D array-like data to a .npy-file in chunks of samples."""
+    out = np.lib.format.open_memmap(fname, mode='w+', dtype=data.dtype,
+                                    shape=data.shape)
+    for start in range(0, data.shape[1], chunk_size):
+        out[:, start:start + chunk_size] = data[:, start:start + chunk_size]
+    out.flush()
+    del out
+
+
+class DiskCache:
+    """Size-limited cache of processed data in a directory.
+
+    Each entry is a sub-directory with .npy-files, which is named by a key
+    from the content-hash of the files and the processing-parameters.
+    If the size exceeds max_mb, the least recently used entries are
+    removed first. The content-hashes of files are remembered for their
+    path, size and modification-time, thus a file is only read once.
+    """
+
+    def __init__(self, cache_dir, max_mb):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_mb * 1e6
+        os.makedirs(cache_dir, exist_ok=True)
+        self._hashes_fname = os.path.join(cache_dir, 'file_hashes.json')
+
+    def get_file_hash(self, fname, block_size=2 ** 20):
+        """Get the sha1-hash of the content of a file."""
+        fname = os.path.abspath(fname)
+        stat = os.stat(fname)
+        stat_key = f'{fname}|{stat.st_size}|{stat.st_mtime_ns}'
+        try:
+            with open(self._hashes_fname) as file:
+                file_hashes = json.load(file)
+        except (OSError, ValueError):
+            file_hashes = dict()
+        if stat_key not in file_hashes:
+            hasher = hashlib.sha1()
+            with open(fname, 'rb') as file:
+                for block in iter(partial(file.read, block_size), b''):
+                    hasher.update(block)
+            file_hashes[stat_key] = hasher.hexdigest()
+            tmp_fname = f'{self._hashes_fname}.{os.getpid()}.tmp'
+            with open(tmp_fname, 'w') as file:
+                json.dump(file_hashes, file)
+            os.replace(tmp_fname, self._hashes_fname)
+
+        return file_hashes[stat_key]
+
+    @staticmethod
+    def get_key(*params):
+        hasher = hashlib.sha1()
+        _hash_params(hasher, params)
+
+        return hasher.hexdigest()
+
+    def get(self, key):
+        """Get the directory of an entry (or None if it doesn't exist)."""
+        path = os.path.join(self.cache_dir, key)
+        if not os.path.isdir(path):
+            return None
+        # The modification-time marks the last use for the eviction.
+        os.utime(path)
+
+        return path
+
+    def put(self, key, arrays):
+        """Store a dictionary of (2D array-like) data as an entry."""
+        path = os.path.join(self.cache_dir, key)
+        # Write into a temporary directory first, so other browsers
+        # never see incomplete entries.
+        tmp_path = f'{path}.{os.getpid()}.tmp'
+        os.makedirs(tmp_path, exist_ok=True)
+        for name, data in arrays.items():
+            fname = os.path.join(tmp_path, f'{name}.npy')
+            if getattr(data, 'ndim', 0) == 2:
+                _save_array(fname, data)
+            else:
+                np.save(fname, data)
+        try:
+            os.rename(tmp_path, path)
+        except OSError:
+            # The entry was stored in the meantime by another browser.
+            shutil.rmtree(tmp_path, ignore_errors=True)
+        self._evict()
+
+    def _evict(self):
+        entries = list()
+        for name in os.listdir(self.cache_dir):
+            path = os.path.join(self.cache_dir, name)
+            if not os.path.isdir(path) or name.endswith('.tmp'):
+                continue
+            size = sum([entry.stat().st_size for entry in os.scandir(path)])
+            entries.append((os.stat(path).st_mtime, size, path))
+        total_size = sum([size for _, size, _ in entries])
+        for _, size, path in sorted(entries):
+            if total_size <= self.max_bytes:
+                break
+            try:
+                shutil.rmtree(path)
+            except OSError:
+                # On Windows files can't be removed while they are mapped.
+                continue
+            total_size -= size
+
+
+class RegularTimes:
+    """The times of regularly sampled data, computed only when indexed.
+
+    The time of sample idx is first_time + idx / sfreq. Slicing returns
+    another RegularTimes, while indexing with integers (or arrays
+    of them) computes the times of only these samples. np.asarray
+    computes all times.
+    """
+    ndim = 1
+    nbytes = 0
+
+    def __init__(self, n_times, sfreq, first_time=0., start=0, step=1):
+        self.n_times = n_times
+        self.sfreq = sfreq
+        self.first_time = first_time
+        self.start = start
+        self.step = step
+
+    def __len__(self):
+        return self.n_times
+
+    @property
+    def shape(self):
+        return (self.n_times,)
+
+    def _get_times(self, idxs):
+        # Computed like np.arange(n_times) / sfreq to get the same floats.
+        return self.first_time + (self.start + self.step * idxs) / self.sfreq
+
+    def __getitem__(self, key):
+        if isinstance(key, tuple):
+            # Allow indexing like times[..., ::decim].
+            key = [k for k in key if k is not Ellipsis]
+            if len(key) != 1:
+                raise IndexError('RegularTimes is one-dimensional.')
+            key = key[0]
+        if isinstance(key, slice):
+            start, stop, step = key.indices(self.n_times)
+            return RegularTimes(len(range(start, stop, step)), self.sfreq,
+                                self.first_time,
+                                self.start + start * self.step,
+                                self.step * step)
+        idxs = np.asarray(key)
+        if idxs.dtype == bool:
+            idxs = np.flatnonzero(idxs)
+        idxs = np.where(idxs < 0, idxs + self.n_times, idxs)
+        if np.any((idxs < 0) | (idxs >= self.n_times)):
+            raise IndexError(f'Index out of bounds for {self.n_times} '
+                             f'samples.')
+        times = self._get_times(idxs)
+        return times[()] if times.ndim == 0 else times
+
+    def __array__(self, dtype=None, copy=None):
+        times = self._get_times(np.arange(self.n_times))
+        return times if dtype is None else times.astype(dtype)
+
+
+# The compression-ratio assumed to estimate the memory of the preloaded
+# data with preload_mode="compressed" (see max_ram).
+_assumed_compression_ratio = 1.5
+# The preload into a memmap is flushed after this many chunks.
+_memmap_flush_chunks = 16
+# The quantization of int16 display-data (see display_dtype) uses this
+# multiple of the range estimated from segments (of one second) spread
+# over the recording.
+_quantize_headroom = 2
+_quantize_n_segments = 64
+# Symmetric range to allow negation without overflow
+_int16_max = 32767
+
+
+def _get_bin_times(times, b0, b1, ds, ds_method):
+    """Get the times of the bins b0 to b1 as set by _apply_downsampling."""
+    bin_starts = np.arange(b0, b1) * ds
+    if ds_method == 'subsample':
+        return times[bin_starts]
+    elif ds_method == 'mean':
+        return times[bin_starts + ds // 2]
+    elif ds_method == 'm4':
+        # The minimum and maximum are shown in the middle of the bin.
+        return np.stack([times[bin_starts], times[bin_starts + ds // 2],
+                         times[bin_starts + ds // 2],
+                         times[bin_starts + ds - 1]], axis=1).ravel()
+    else:
+        return np.repeat(times[bin_starts + ds // 2], 2)
+
+
+def _make_ds_func(kernel, ds_method, remove_dc=False):
+    """Wrap a built-in kernel as func(times, data, ds) for the registry."""
+    def ds_func(times, data, ds):
+        data = kernel(data, ds, remove_dc)
+        if ds_method == 'lttb':
+            # The times are selected for each channel.
+            data, idxs = data
+            return times[idxs], data
+        elif ds_method == 'subsample':
+            return np.asarray(times[::ds]), data
+        else:
+            return _get_bin_times(times, 0, len(times) // ds, ds,
+                                  ds_method), data
+
+    return ds_func
+
+
+# The built-in methods with the vertices per bin and if each bin is
+# computed only from its own samples (lttb depends on the previous bin).
+_builtin_ds_methods = dict(subsample=(1, True), mean=(1, True),
+                           peak=(2, True), m4=(4, True), lttb=(1, False))
+
+
+def _get_builtin_ds_kernels(use_numba=True):
+    kernels = _get_kernels(use_numba)
+    return {name: dict(func=_make_ds_func(kernels[name], name),
+                       samples_per_bin=samples_per_bin,
+                       block_cacheable=block_cacheable,
+                       dc_func=_make_ds_func(kernels[name], name,
+                                             remove_dc=True))
+            for name, (samples_per_bin, block_cacheable)
+            in _builtin_ds_methods.items()}
+
+
+_builtin_ds_kernels = _get_builtin_ds_kernels()
+# The downsampling-methods available for ds_method
+_ds_kernels = dict(_builtin_ds_kernels)
+
+
+def register_ds_kernel(name, func, samples_per_bin, block_cacheable=False,
+                       dc_func=None):
+    """Register a downsampling-method, which is then available as ds_method.
+
+    Parameters
+    ----------
+    name : str
+        The name for ds_method. Registering an existing name replaces
+        the method for browsers created afterwards.
+    func : callable
+        Called as func(times, data, ds) with times of shape (n_times,)
+        (always as ndarray) and data of shape (n_channels, n_times).
+        func returns the times of the vertices (of shape (n_vertices,) or,
+        if they differ between channels, (n_channels, n_vertices)) and the
+        data of shape (n_channels, n_vertices).
+    samples_per_bin : int
+        The number of vertices returned for each bin of ds samples.
+    block_cacheable : bool
+        If True, each bin is computed only from its own samples and the
+        times are the same for all channels. Then the bins are computed
+        in chunks, cached and updated incrementally. Defaults to False.
+    dc_func : callable | None
+        Optionally a function like func, which additionally removes the
+        mean of data in the same pass.
+    """
+    if dc_func is not None:
+        dc_func = _with_array_times(dc_func)
+    _ds_kernels[name] = dict(func=_with_array_times(func),
+                             samples_per_bin=samples_per_bin,
+                             block_cacheable=block_cacheable,
+                             dc_func=dc_func)
+
+
+def _with_array_times(func):
+    """Pass and return the times of a registered func as ndarray.
+
+    The times of preloaded data are a RegularTimes and slices of it
+    (e.g. times[::ds]) would be returned as RegularTimes too.
+    """
+    def ds_func(times, data, ds):
+        times_ds, data_ds = func(np.asarray(times), data, ds)
+        return np.asarray(times_ds), data_ds
+
+    return ds_func
+
+
+def _get_ds_kernels(use_numba=True):
+    """Get the registered downsampling-methods.
+
+    The built-in methods use the NumPy-kernels if use_numba is False.
+    """
+    ds_kernels = dict(_ds_kernels)
+    if not use_numba:
+        for name, ds_kernel in _get_builtin_ds_kernels(False).items():
+            if ds_kernels.get(name) is _builtin_ds_kernels[name]:
+                ds_kernels[name] = ds_kernel
+
+    return ds_kernels
+
+
+class IncrementalWindow:
+    """Downsampled window of preloaded data, which is updated on pans.
+
+    The bins are aligned to multiples of ds from sample 0 and kept in a
+    ring-buffer, where bin b is stored at b modulo the capacity. When the
+    window is shifted, only the bins entering the window are computed,
+    the bins leaving it are overwritten later. The sums for the removal
+    of the DC-offset are updated from the samples entering and leaving
+    the window.
+    """
+
+    def __init__(self, ds_kernels):
+        self.ds_kernels = ds_kernels
+        self.key = None
+        self.capacity = 0
+        self.b0 = 0
+        self.b1 = 0
+        self.ring = None
+        self.ring_times = None
+        self.sums = None
+        self.n_updated = 0
+        self.n_recomputed = 0
+        self._lock = Lock()
+
+    def _compute_bins(self, times, data, b0, b1, ds, ds_method):
+        ds_kernel = self.ds_kernels[ds_method]
+        bin_times, bin_data = ds_kernel['func'](times[b0 * ds:b1 * ds],
+                                                data[:, b0 * ds:b1 * ds], ds)
+        samples_per_bin = ds_kernel['samples_per_bin']
+        return (bin_times.reshape((b1 - b0, samples_per_bin)),
+                bin_data.reshape((data.shape[0], b1 - b0, samples_per_bin)))
+
+    def _write_bins(self, times, data, b0, b1, ds, ds_method):
+        if b0 >= b1:
+            return
+        slots = np.arange(b0, b1) % self.capacity
+        self.ring_times[slots], self.ring[:, slots] = self._compute_bins(
+            times, data, b0, b1, ds, ds_method)
+
+    def _get_sum(self, data, b0, b1, ds):
+        return np.asarray(data[:, b0 * ds:b1 * ds]).sum(axis=1)
+
+    def get_window(self, times, data, start, stop, ds, ds_method, remove_dc,
+                   generation):
+        """Get the downsampled bins inside [start, stop).
+
+        Returns None if the window contains no full bin.
+        """
+        b0 = -(-start // ds)
+        b1 = stop // ds
+        if b1 <= b0:
+            return None
+        key = (ds, ds_method, generation)
+        with self._lock:
+            overlaps = self.key == key and b0 < self.b1 and b1 > self.b0 \
+                and b1 - b0 <= self.capacity
+            if overlaps:
+                # Compute only the bins entering the window and update
+                # the sums by the samples entering and leaving it.
+                self._write_bins(times, data, b0, min(self.b0, b1), ds,
+                                 ds_method)
+                self._write_bins(times, data, max(self.b1, b0), b1, ds,
+                                 ds_method)
+                if b0 < self.b0:
+                    self.sums += self._get_sum(data, b0, self.b0, ds)
+                else:
+                    self.sums -= self._get_sum(data, self.b0, b0, ds)
+                if b1 > self.b1:
+                    self.sums += self._get_sum(data, self.b1, b1, ds)
+                else:
+                    self.sums -= self._get_sum(data, b1, self.b1, ds)
+                self.n_updated += 1
+            else:
+                # Leave some space for windows changing by a bin
+                # because of rounding.
+                self.capacity = b1 - b0 + 2
+                bin_times, bin_data = self._compute_bins(times, data, b0, b1,
+                                                         ds, ds_method)
+                self.ring_times = np.empty((self.capacity,
+                                            bin_times.shape[1]))
+                self.ring = np.empty((data.shape[0], self.capacity,
+                                      bin_data.shape[2]))
+                slots = np.arange(b0, b1) % self.capacity
+                self.ring_times[slots] = bin_times
+                self.ring[:, slots] = bin_data
+                self.sums = self._get_sum(data, b0, b1, ds)
+                self.key = key
+                self.n_recomputed += 1
+            self.b0, self.b1 = b0, b1
+
+            slots = np.arange(b0, b1) % self.capacity
+            window_times = self.ring_times[slots].ravel()
+            window_data = self.ring[:, slots].reshape((data.shape[0], -1))
+            if remove_dc:
+                window_data -= (self.sums / ((b1 - b0) * ds))[:, np.newaxis]
+
+        return window_times, window_data
+
+    def clear(self):
+        with self._lock:
+            self.key = None
+            self.ring = None
+            self.ring_times = None
+            self.sums = None
+
+
+def _zscore_rgba(z):
+    """Map z-scores to blue (negative) and red (positive) RGBA-colors.
+
+    The alpha-value scales with the ratio to the minimum/maximum z-score
+    of each row.
+    """
+    z = np.nan_to_num(z)
+    zmin = z.min(axis=1, keepdims=True)
+    zmax = z.max(axis=1, keepdims=True)
+    neg = z < 0
+    pos = z > 0
+    alpha = np.zeros(z.shape)
+    # Rows without negative/positive values are masked anyway.
+    with np.errstate(divide='ignore', invalid='ignore'):
+        alpha[neg] = (255 * z / zmin)[neg]
+        alpha[pos] = (255 * z / zmax)[pos]
+
+    zrgba = np.zeros((*z.shape, 4), dtype=np.uint8)
+    zrgba[neg, 2] = 255
+    zrgba[pos, 0] = 255
+    zrgba[..., 3] = alpha
+
+    return zrgba
+
+
 class LoadRunnerSignals(QObject):
-    loadProgress = pyqtSignal(int)
+    # Emits the number of loaded chunks, the loaded bytes
+    # and the throughput in bytes/s.
+    loadProgress = pyqtSignal(int, int, float)
+    # Emits start and stop of a chunk, which was written to the buffer.
+    chunkLoaded = pyqtSignal(int, int)
     processText = pyqtSignal(str)
     loadingFinished = pyqtSignal()
+    # Emitted when a cancelled runner stopped.
+    loadingCancelled = pyqtSignal()
 
 
 class LoadRunner(QRunnable):
@@ -1058,60 +2481,335 @@ class LoadRunner(QRunnable):
         self.browser = browser
         self.mne = browser.mne
         self.sigs = LoadRunnerSignals()
+        # Loading stops between chunks when cancelled is set
+        # (see cancel_preload).
+        self.cancelled = False
+        # Set when run() returns (also if it was cancelled).
+        self.done = Event()
+        # The runner is kept by the browser to be cancelled.
+        self.setAutoDelete(False)
+        # Get the display-width here because QApplication should only be
+        # accessed from the main thread.
+        self.max_pixel_width = \
+            QApplication.desktop().screenGeometry().width()
 
     def run(self):
         """Load and process data in a separate QThread."""
-        # Split data loading into 10 chunks to show user progress.
+        try:
+            self._load()
+        finally:
+            self.done.set()
+            if self.cancelled:
+                # The browser releases the buffers (see _preload_cancelled).
+                self.sigs.loadingCancelled.emit()
+
+    def _load(self):
+        cache_key = self.browser._get_disk_cache_key()
+        if cache_key is not None:
+            cache_path = self.mne.disk_cache.get(cache_key)
+            if cache_path is not None:
+                self.sigs.processText.emit('Loading from Cache...')
+                self._load_from_disk_cache(cache_path)
+                if not self.cancelled:
+                    self.sigs.loadingFinished.emit()
+                return
+
+        # Show the progress of loading in 10 steps.
         # Testing showed that e.g. n_chunks=100 extends loading time
         # (at least for the sample dataset)
         # because of the frequent gui-update-calls.
         # Thus n_chunks = 10 should suffice.
-        data = None
-        times = None
         n_chunks = 10
+        picks = self.mne.ch_order
+        # Deactive remove dc because it will be removed for visible range
+        self.browser._stash_remove_dc()
+
         if not self.mne.is_epochs:
-            chunk_size = len(self.browser.mne.inst) // n_chunks
-            for n in range(n_chunks):
-                start = n * chunk_size
-                if n == n_chunks - 1:
-                    # Get last chunk which may be larger due to rounding above
-                    stop = None
-                else:
-                    stop = start + chunk_size
-                # Load data
-                data_chunk, times_chunk = self.browser._load_data(start, stop)
-                if data is None:
-                    data = data_chunk
-                    times = times_chunk
+            n_times = len(self.mne.inst)
+            # Allocate the final buffers once and fill them chunk by chunk
+            # to avoid the copies (and the doubled peak-memory)
+            # of growing them with np.concatenate.
+            data = self.browser._get_preload_buffer(len(picks), n_times)
+            # A complete file in memmap_path is mapped read-only.
+            complete = isinstance(data, np.memmap) and data.mode == 'r'
+            # The times are computed from the sample-index when needed
+            # instead of keeping 8 bytes for each sample.
+            times = RegularTimes(n_times, self.mne.info['sfreq'])
+            # Compute the columns of the z-score overview while loading.
+            if self.mne.overview_mode == 'zscore' and not complete:
+                col_means = ColumnMeans(len(picks), n_times,
+                                        self.max_pixel_width)
+            else:
+                col_means = None
+            if data.dtype == np.int16 and not complete:
+                self.browser._fit_quantization(picks)
+            # Windows are shown from the buffer as soon as all their
+            # chunks are loaded (see loaded_mask).
+            chunk_size = self.browser._get_load_chunk_size(n_times)
+            loaded = np.full(-(-n_times // chunk_size), complete)
+            self.browser.mne.global_data = data
+            self.browser.mne.global_times = times
+            self.mne.load_chunk_size = chunk_size
+            self.mne.loaded_mask = loaded
+            load_bytes = 0
+            load_start = perf_counter()
+            # The chunks are loaded with an overlap of the filter-pad
+            # to avoid filter-artifacts at their edges.
+            for n, (chunk_idx, start, stop, data_chunk) in enumerate(
+                    self._load_chunks(loaded, chunk_size, n_times, picks)):
+                load_bytes += data_chunk.nbytes
+                # Invert Data to be displayed from top on inverted Y-Axis
+                # while writing it into the buffer.
+                if isinstance(data, CompressedChunkStore):
+                    display_chunk = np.empty((len(picks), stop - start),
+                                             dtype=data.dtype)
                 else:
-                    data = np.concatenate((data, data_chunk), axis=1)
-                    times = np.concatenate((times, times_chunk), axis=0)
-                self.sigs.loadProgress.emit(n + 1)
+                    display_chunk = data[:, start:stop]
+                self.browser._store_display_data(data_chunk, display_chunk)
+                if isinstance(data, CompressedChunkStore):
+                    data.write(start, display_chunk)
+                if col_means is not None:
+                    col_means.add(display_chunk, start)
+                if isinstance(data, np.memmap) \
+                        and (n + 1) % _memmap_flush_chunks == 0:
+                    # Bound the dirty pages, which can't be evicted
+                    # before they are written back.
+                    data.flush()
+                loaded[chunk_idx] = True
+                self.sigs.chunkLoaded.emit(start, stop)
+                progress = n_chunks * (n + 1) // len(loaded)
+                if progress > n_chunks * n // len(loaded):
+                    throughput = load_bytes / (perf_counter() - load_start)
+                    self.sigs.loadProgress.emit(progress, load_bytes,
+                                                throughput)
         else:
-            self.browser._load_data()
-            self.sigs.loadProgress.emit(n_chunks)
-
-        picks = self.browser.mne.ch_order
-        # Deactive remove dc because it will be removed for visible range
-        stashed_remove_dc = self.mne.remove_dc
-        self.mne.remove_dc = False
-        data = self.browser._process_data(data, start, stop, picks,
-                                          self.sigs)
-        self.mne.remove_dc = stashed_remove_dc
+            col_means = None
+            data, times = self.browser._load_data()
+            if self.cancelled:
+                self.browser._restore_remove_dc()
+                return
+            self.sigs.loadProgress.emit(n_chunks, data.nbytes, 0.)
+            data = self.browser._process_data(data, 0, len(times), picks,
+                                              self.sigs)
+            # Invert Data to be displayed from top on inverted Y-Axis.
+            if data.dtype == self.mne.display_dtype:
+                out = data
+            else:
+                out = np.empty(data.shape, dtype=self.mne.display_dtype)
+            self.browser._store_display_data(data, out)
+            data = out
 
-        # Invert Data to be displayed from top on inverted Y-Axis.
-        data *= -1
+        self.browser._restore_remove_dc()
+        # The partially loaded buffers are released by cancel_preload.
+        if self.cancelled:
+            return
+        if self.mne.display_clipped > 0:
+            logger.warning(f'{self.mne.display_clipped} samples exceed the '
+                           f'range of the int16-quantization and are '
+                           f'clipped.')
+
+        if isinstance(data, np.memmap) and data.mode != 'r':
+            # Write everything to disk and map the file read-only,
+            # which also allows other browsers to share it.
+            data.flush()
+            data = np.memmap(data.filename, dtype=data.dtype, mode='r',
+                             shape=data.shape)
+            if self.mne.memmap_path is not None:
+                self.browser._write_memmap_info(data.shape)
 
         self.browser.mne.global_data = data
         self.browser.mne.global_times = times
+        logger.info(f'Preloaded data uses {data.nbytes / 1e6:.1f} MB '
+                    f'({data.dtype})')
+        if isinstance(data, CompressedChunkStore):
+            logger.info(f'Compression-ratio: {data.get_stats()["ratio"]} '
+                        f'({data.compress_time:.2f} s for compression)')
+
+        # Build the downsampling-pyramid
+        if self.mne.use_ds_pyramid:
+            self.sigs.processText.emit('Building Downsampling-Pyramid...')
+            pyramid = MinMaxPyramid(data)
+            logger.info(f'Downsampling-Pyramid uses '
+                        f'{pyramid.nbytes / 1e6:.1f} MB')
+            self.browser.mne.ds_pyramid = pyramid
+        if self.cancelled:
+            return
 
         # Calculate Z-Scores
-        if self.mne.overview_mode == 'zscore':
+        if col_means is not None:
+            self.browser._set_zscore(col_means.means)
+        elif self.mne.overview_mode == 'zscore':
             self.sigs.processText.emit('Calculating Z-Scores...')
-            self.browser._get_zscore(data)
+            self.browser._get_zscore(data, self.max_pixel_width)
+
+        if self.cancelled:
+            return
+
+        if cache_key is not None:
+            self.sigs.processText.emit('Writing to Cache...')
+            self._save_to_disk_cache(cache_key, col_means)
 
         self.sigs.loadingFinished.emit()
 
+    def _load_chunks(self, loaded, chunk_size, n_times, picks):
+        """Load and process the chunks on a pool of preload_threads.
+
+        The chunks are yielded in the order they are finished. Only one
+        chunk per thread is requested at once, thus the order follows
+        changes of the view. When cancelled, no more chunks are yielded
+        after the chunks in process are finished.
+        """
+        n_threads = self.browser._get_preload_threads()
+        requested = loaded.copy()
+        with ThreadPoolExecutor(n_threads) as executor:
+            futures = dict()
+            while not self.cancelled \
+                    and (len(futures) > 0 or not requested.all()):
+                while len(futures) < n_threads and not requested.all():
+                    chunk_idx = self._get_next_chunk(requested, chunk_size)
+                    requested[chunk_idx] = True
+                    start = chunk_idx * chunk_size
+                    stop = min(start + chunk_size, n_times)
+                    # Load and process with overlap to avoid
+                    # filter-artifacts at the edges of the chunks.
+                    future = executor.submit(self.browser._load_processed,
+                                             start, stop, picks,
+                                             stashed_dc=True)
+                    futures[future] = (chunk_idx, start, stop)
+                done, _ = wait(futures, return_when=FIRST_COMPLETED)
+                for future in done:
+                    chunk_idx, start, stop = futures.pop(future)
+                    yield chunk_idx, start, stop, future.result()[1]
+
+    def _get_next_chunk(self, loaded, chunk_size):
+        """Get the unloaded chunk, which is closest to the visible window.
+
+        Thus the visible window is loaded first and then the loading
+        expands outwards, following the view when it moves.
+        """
+        unloaded = np.flatnonzero(~loaded)
+        if not self.mne.progressive_preload:
+            return unloaded[0]
+        # The view-range published by the main thread
+        start, stop = self.mne.view_range
+        chunk_starts = unloaded * chunk_size
+        # The distance is 0 for chunks overlapping the window.
+        distances = np.maximum(start - (chunk_starts + chunk_size),
+                               chunk_starts - stop).clip(min=0)
+
+        return unloaded[np.argmin(distances)]
+
+    def _save_to_disk_cache(self, cache_key, col_means):
+        arrays = dict(data=self.browser.mne.global_data)
+        if col_means is not None:
+            arrays['zscore_means'] = col_means.means
+        if self.mne.display_scale is not None:
+            arrays['display_scale'] = self.mne.display_scale
+            arrays['display_offset'] = self.mne.display_offset
+        if self.mne.ds_pyramid is not None:
+            arrays.update({f'pyramid_{name}': array for name, array
+                           in self.mne.ds_pyramid.get_arrays().items()})
+        self.mne.disk_cache.put(cache_key, arrays)
+
+    def _load_from_disk_cache(self, cache_path):
+        """Load processed data and overview-products from the disk-cache."""
+        arrays = {fname[:-4]: os.path.join(cache_path, fname)
+                  for fname in os.listdir(cache_path)
+                  if fname.endswith('.npy')}
+        data = np.load(arrays.pop('data'), mmap_mode='r')
+        n_channels, n_times = data.shape
+        if self.mne.preload_mode == 'ram':
+            data = np.array(data)
+        elif self.mne.preload_mode == 'compressed':
+            store = self.browser._get_preload_buffer(n_channels, n_times)
+            for start in range(0, n_times, store.chunk_size):
+                if self.cancelled:
+                    return
+                store.write(start, data[:, start:start + store.chunk_size])
+            data = store
+        # With preload_mode='memmap', the file of the cache is mapped.
+        if self.cancelled:
+            return
+        self.sigs.loadProgress.emit(10, data.nbytes, 0.)
+        arrays = {name: np.load(fname) for name, fname in arrays.items()}
+        if 'display_scale' in arrays:
+            self.mne.display_scale = arrays['display_scale']
+            self.mne.display_offset = arrays['display_offset']
+        self.browser.mne.global_data = data
+        self.browser.mne.global_times = RegularTimes(n_times,
+                                                     self.mne.info['sfreq'])
+        logger.info(f'Preloaded data loaded from {cache_path}')
+
+        if self.mne.use_ds_pyramid and not self.cancelled:
+            pyramid_arrays = {name[8:]: array for name, array
+                              in arrays.items() if name.startswith('pyramid_')}
+            if len(pyramid_arrays) > 0:
+                pyramid = MinMaxPyramid.from_arrays(pyramid_arrays)
+            else:
+                self.sigs.processText.emit('Building Downsampling-Pyramid...')
+                pyramid = MinMaxPyramid(data)
+            self.browser.mne.ds_pyramid = pyramid
+
+        if self.mne.overview_mode == 'zscore' and not self.cancelled:
+            if 'zscore_means' in arrays:
+                col_means = arrays['zscore_means']
+            else:
+                self.sigs.processText.emit('Calculating Z-Scores...')
+                col_means = ColumnMeans(n_channels, n_times,
+                                        self.max_pixel_width)
+                for start in range(0, n_times, 2 ** 20):
+                    col_means.add(data[:, start:start + 2 ** 20], start)
+                col_means = col_means.means
+            self.browser._set_zscore(col_means)
+
+
+class BlockRunner(QRunnable):
+    """Process blocks of data in a separate QThread to prefetch them."""
+
+    def __init__(self, browser, block_idxs, state):
+        super().__init__()
+        self.browser = browser
+        self.mne = browser.mne
+        self.block_idxs = block_idxs
+        self.state = state
+
+    def run(self):
+        picks = np.asarray(self.state[0])
+        for block_idx in self.block_idxs:
+            # Skip blocks which left the region around the view
+            # (with preload_mode="window").
+            region = self.mne.window_region
+            if region is not None and (
+                    region[2] != self.state
+                    or not region[0] <= block_idx <= region[1]):
+                self.mne.pending_blocks.discard((block_idx, self.state))
+                continue
+            block = self.browser._load_block(block_idx, picks)
+            self.mne.block_cache.put((block_idx, self.state), block)
+            self.mne.pending_blocks.discard((block_idx, self.state))
+
+
+class WindowRunnerSignals(QObject):
+    windowReady = pyqtSignal(object, object, object)
+
+
+class WindowRunner(QRunnable):
+    """Compute the data of the view in a separate QThread."""
+
+    def __init__(self, browser, view):
+        super().__init__()
+        self.browser = browser
+        self.mne = browser.mne
+        self.view = view
+        self.sigs = WindowRunnerSignals()
+
+    def run(self):
+        # Skip requests, which were superseded while they were queued.
+        if self.view['request'] != self.mne.window_request:
+            return
+        times, data = self.browser._compute_window(self.view)
+        self.sigs.windowReady.emit(self.view, times, data)
+
 
 class _PGMetaClass(type(BrowserBase), type(QMainWindow)):
     """This is class is necessary to prevent a metaclass conflict.
@@ -1139,15 +2837,47 @@ class PyQtGraphPtyp(BrowserBase, QMainWindow, metaclass=_PGMetaClass):
             The downsampling-method to use (from pyqtgraph).
             See here under "Optimization-Keywords" for more detail:
             https://pyqtgraph.readthedocs.io/en/latest/graphicsItems/plotdataitem.html?#
+            Additionally available are "m4" (first, minimum, maximum and
+            last value of each bin) and "lttb" (the point of each bin
+            forming the largest triangle with its neighbors,
+            Largest-Triangle-Three-Buckets). Further methods can be added
+            with register_ds_kernel.
         ds_chunk_size : int | None
-            Chunk size for downsampling. No chunking if None (default).
+            Chunk size (in samples, rounded to a multiple of the
+            downsampling-factor) for downsampling, which bounds the
+            temporary memory. With preloaded data, the downsampled chunks
+            are cached and reused across pans. If None (default),
+            the window is downsampled at once and the cached chunks have
+            1024 bins.
         antialiasing : bool
             Enable Antialiasing.
         use_opengl : bool
             Use OpenGL.
+        render_mode : str
+            Either "items" (default) to draw each channel with its own
+            graphics-item or "batched" to draw all visible channels with
+            one graphics-item, which reduces the overhead per channel
+            for a high number of channels. With "tiles", the traces of
+            preloaded data are rasterized into tiles, which are reused
+            while scrolling at a fixed zoom.
+        tile_width : int
+            The width of the tiles in pixels for render_mode="tiles".
+            Defaults to 256.
+        tile_cache_mb : float
+            The memory-budget (in MB) of the tiles for render_mode="tiles".
+            Defaults to 100.
+        render_threads : int
+            The number of threads rendering the tiles for
+            render_mode="tiles" (-1 to use all cores). With 0 (default),
+            the tiles are rendered in the main thread while painting.
         enable_ds_cache : bool
-            If True cache the downsampled arrays inside RawCurveItems
-            per downsampling-factor.
+            If True, the downsampled data is cached per
+            downsampling-factor, ds_method, processing-state and
+            start/stop-sample of the window (or chunk of bins
+            for preloaded data, see ds_chunk_size).
+        ds_cache_mb : float
+            The memory-budget (in MB) of the downsampling-cache. The least
+            recently used windows are evicted first. Defaults to 100.
         tsteps_per_window : int
             Set how many single scrolling-steps are done in time
             for the shown time-window.
@@ -1157,11 +2887,117 @@ class PyQtGraphPtyp(BrowserBase, QMainWindow, metaclass=_PGMetaClass):
             If True, preprocessing steps are applied on all data
             and are repeated only if necessary. If False (default),
             preprocessing is applied only on the visible data.
+        block_cache_mb : float | None
+            If preload=False, processed blocks of data are cached up to this
+            amount of memory (in MB) and reused when scrolling back and
+            forth. Set to None to disable. Defaults to 200.
+        block_size : int
+            The number of samples of a block for block_cache_mb.
+            Defaults to 4096.
+        prefetch_blocks : int
+            How many blocks are processed in advance in a separate thread
+            in the direction of scrolling. Defaults to 4.
+        use_numba : bool
+            If True (default) and numba is installed, compiled kernels
+            are used for downsampling, DC-removal and the z-score
+            overview. Otherwise NumPy is used.
         overview_mode : str | None
             Set the mode for the display of an overview over the data. 
             Currently available is "zscore" to display the zscore for
             each channel across time. This only works if preload=True.
             Defaults to "zscore".
+        preload_mode : str
+            How the data is stored if preload=True. Either "ram" (default)
+            to keep it in memory or "memmap" to write it into a
+            memory-mapped file (see memmap_path). With "memmap" the
+            residency of the data is left to the page cache of the OS.
+            With "compressed", the data of raw-instances is kept in memory
+            as independently compressed chunks of time, which are
+            decompressed when they are shown (see compression_codec).
+            With "window", only the processed blocks of raw-data in a
+            region around the view are kept (see preload_margin), which
+            is shifted in a separate thread while scrolling.
+            Epochs can only be preloaded with "ram".
+        preload_margin : float
+            With preload_mode="window", the processed data of this many
+            durations before and after the view is kept in memory.
+            Blocks outside are released. Defaults to 10.
+        memmap_path : str | None
+            The file used for preload_mode="memmap". If None (default),
+            a temporary file is created, which is removed on close.
+            A complete file written with the same data and processing
+            (marked by memmap_path + ".json") is mapped read-only
+            instead of being loaded again, thus browsers can share it.
+        display_dtype : str
+            The dtype in which preloaded data is stored. Either "float64"
+            (default), "float32" to halve the memory or "int16" to quarter
+            it. With "int16", the data is quantized with a scale and offset
+            per channel from the range estimated from segments spread over
+            the recording (with some headroom); values outside are clipped,
+            which is shown in the status-bar.
+            Only the downsampled vertices of the view are converted back.
+        compression_codec : str
+            The codec for preload_mode="compressed". Either "zlib"
+            (default), "lz4" or "blosc" (which need the packages lz4
+            or blosc).
+        compression_level : int
+            The compression-level of compression_codec. Defaults to 1.
+        compression_chunk_size : int
+            The number of samples of the compressed chunks.
+            Defaults to 16384.
+        hot_cache_mb : float
+            The memory-budget (in MB) of the recently decompressed chunks
+            for preload_mode="compressed". Defaults to 50.
+        cache_dir : str | None
+            A directory to store the preloaded data of raw-files with the
+            downsampling-pyramid and the z-scores of the overview. When
+            the same data is opened again with the same processing (picks,
+            projections, filter and display_dtype), the preload is skipped.
+            With preload_mode="memmap", the file in the cache is mapped.
+            If None (default), nothing is stored.
+        cache_max_mb : float
+            The size-limit (in MB) of cache_dir. The least recently used
+            entries are removed first. Defaults to 5000.
+        max_ram : float | None
+            The memory (in MB) available for the data and the caches.
+            The memory is estimated from the dimensions of the data and
+            the first fitting of preloading into RAM, into a memmap,
+            into compressed chunks or streaming from the file (preload=False)
+            is chosen. The chosen plan with its estimated memory is stored
+            as preload_plan. If None (default), preload and preload_mode
+            are used as set.
+        preload_threads : int
+            The number of threads loading and processing the chunks of
+            the preload of raw-data in parallel (-1 to use all cores).
+            Defaults to 1.
+        progressive_preload : bool
+            If True (default), the preload of raw-data starts with the
+            visible window and expands outwards from the current view
+            (also after it moved). Windows are shown from the preloaded
+            data as soon as they are loaded. If False, the data is loaded
+            from start to end.
+        use_ds_pyramid : bool
+            If True, a pyramid of minima/maxima with power-of-two
+            bin-sizes is built while preloading, from which the view is
+            rendered with ds_method='peak'. This makes the cost of a frame
+            depend on the pixel-width instead of the shown duration.
+            Defaults to False.
+        coalesce_updates : bool
+            If True (default), changes of the view-range are collected and
+            the data is updated at most once per frame with the latest
+            range. Intermediate ranges (e.g. from holding an arrow-key or
+            dragging a scrollbar) are dropped.
+        incremental_update : bool
+            If True, the downsampled window of preloaded data is kept in a
+            ring-buffer with bins aligned to multiples of ds from the first
+            sample. On pans only the bins entering the window are computed
+            and the DC-offset is updated from running sums.
+            Defaults to False.
+        async_update : bool
+            If True, the data for a changed time-range is loaded, processed
+            and downsampled in a separate thread while the last frame stays
+            visible. Results of requests superseded in the meantime are
+            discarded. Defaults to False.
         """
         self.pg_kwarg_defaults = dict(duration=20,
                                       n_channels=30,
@@ -1171,14 +3007,40 @@ class PyQtGraphPtyp(BrowserBase, QMainWindow, metaclass=_PGMetaClass):
                                       ds_method='peak',
                                       ds_chunk_size=None,
                                       antialiasing=False,
+                                      render_mode='items',
+                                      tile_width=256,
+                                      tile_cache_mb=100,
+                                      render_threads=0,
                                       use_opengl=True,
                                       enable_ds_cache=True,
+                                      ds_cache_mb=100,
                                       tsteps_per_window=100,
                                       check_nan=False,
+                                      use_numba=True,
                                       remove_dc=True,
                                       preload=True,
+                                      block_cache_mb=200,
+                                      block_size=4096,
+                                      prefetch_blocks=4,
+                                      preload_mode='ram',
+                                      preload_margin=10,
+                                      memmap_path=None,
+                                      display_dtype='float64',
+                                      compression_codec='zlib',
+                                      compression_level=1,
+                                      compression_chunk_size=16384,
+                                      hot_cache_mb=50,
+                                      cache_dir=None,
+                                      cache_max_mb=5000,
+                                      progressive_preload=True,
+                                      preload_threads=1,
+                                      max_ram=None,
+                                      use_ds_pyramid=False,
                                       show_overview_bar=True,
-                                      overview_mode='channels')
+                                      overview_mode='channels',
+                                      coalesce_updates=True,
+                                      async_update=False,
+                                      incremental_update=False)
         for kw in [k for k in self.pg_kwarg_defaults if k not in kwargs]:
             kwargs[kw] = self.pg_kwarg_defaults[kw]
 
@@ -1187,8 +3049,122 @@ class PyQtGraphPtyp(BrowserBase, QMainWindow, metaclass=_PGMetaClass):
 
         # Initialize attributes which are only used by pyqtgraph, not by
         # matplotlib and add them to MNEBrowseParams.
-        self.mne.ds_cache = dict()
+        if self.mne.enable_ds_cache:
+            self.mne.ds_cache = LRUCache(self.mne.ds_cache_mb * 1e6)
+        else:
+            self.mne.ds_cache = None
+        # The generation is counted up every time the processed data
+        # changes to invalidate cached data.
+        self.mne.processing_state = None
+        self.mne.processing_generation = 0
+        self.mne.kernels = _get_kernels(self.mne.use_numba)
+        self.mne.ds_kernels = _get_ds_kernels(self.mne.use_numba)
+        if self.mne.ds_method not in self.mne.ds_kernels:
+            raise ValueError(f'ds_method has to be one of '
+                             f'{list(self.mne.ds_kernels)}, '
+                             f'not {self.mne.ds_method}.')
+        self.mne.incr_window = IncrementalWindow(self.mne.ds_kernels)
         self.mne.data_preloaded = False
+        self.mne.memmap_tmp_path = None
+        self.mne.ds_pyramid = None
+        self.mne.display_dtype = np.dtype(self.mne.display_dtype)
+        if self.mne.display_dtype not in (np.float64, np.float32, np.int16):
+            raise ValueError(f'display_dtype has to be one of "float64", '
+                             f'"float32" or "int16", '
+                             f'not {self.mne.display_dtype}.')
+        # Check the codec (and that its package is installed) here,
+        # since the compressed preload fails in the LoadRunner-thread
+        # (preload_mode="compressed" can also be chosen with max_ram).
+        _get_codec(self.mne.compression_codec, self.mne.compression_level,
+                   self.mne.display_dtype.itemsize)
+        preload_modes = ['ram', 'memmap', 'compressed', 'window']
+        if self.mne.preload_mode not in preload_modes:
+            raise ValueError(f'preload_mode has to be one of '
+                             f'{preload_modes}, '
+                             f'not {self.mne.preload_mode}.')
+        if self.mne.preload_mode != 'ram' and self.mne.is_epochs:
+            raise ValueError(f'preload_mode="{self.mne.preload_mode}" is '
+                             f'only available for raw-data.')
+        render_modes = ['items', 'batched', 'tiles']
+        if self.mne.render_mode not in render_modes:
+            raise ValueError(f'render_mode has to be one of '
+                             f'{render_modes}, '
+                             f'not {self.mne.render_mode}.')
+        # The user-setting of remove_dc while it is deactivated
+        # for the preload (by dc_stash_count callers).
+        self.mne.stashed_remove_dc = None
+        self.mne.dc_stash_count = 0
+        # Chunks loaded by the LoadRunner until the preload is finished
+        self.mne.loaded_mask = None
+        self.mne.load_chunk_size = None
+        # The LoadRunner of a running preload and of a cancelled preload,
+        # which didn't stop yet (see cancel_preload)
+        self.mne.load_runner = None
+        self.mne.stopping_runner = None
+        self.mne.restart_preload = False
+        # The samples of the view (updated in the main thread)
+        self.mne.view_range = (0, 0)
+        # Scale and offset per channel of int16-quantized data
+        self.mne.display_scale = None
+        self.mne.display_offset = None
+        # Samples clipped by the int16-quantization
+        self.mne.display_clipped = 0
+        if self.mne.cache_dir is not None:
+            self.mne.disk_cache = DiskCache(self.mne.cache_dir,
+                                            self.mne.cache_max_mb)
+        else:
+            self.mne.disk_cache = None
+        # Choose the preload-mode fitting into max_ram.
+        self.mne.preload_plan = self._get_preload_plan()
+        plan_mode = self.mne.preload_plan['mode']
+        if plan_mode in ('stream', 'window'):
+            # The data is processed in blocks.
+            self.mne.preload = False
+        if plan_mode != 'stream':
+            self.mne.preload_mode = plan_mode
+        self.mne.preload_window = plan_mode == 'window'
+        # The blocks (first, last) and processing-state of the region
+        # which is kept around the view with preload_mode="window".
+        self.mne.window_region = None
+        # The itemsizes of the times and data of processed blocks
+        self.mne.block_itemsizes = (np.dtype(np.float64).itemsize,
+                                    np.dtype(np.float64).itemsize)
+        # Cache processed blocks of data if data is not preloaded.
+        if self.mne.preload_window:
+            # The memory of the region as planned (see _shift_preload_window)
+            self.mne.window_budget = \
+                self.mne.preload_plan['footprint_mb']['data'] * 1e6
+            self.mne.block_cache = LRUCache(self.mne.window_budget)
+        elif not self.mne.preload and not self.mne.is_epochs \
+                and self.mne.block_cache_mb:
+            self.mne.block_cache = LRUCache(self.mne.block_cache_mb * 1e6)
+        else:
+            self.mne.block_cache = None
+        self.mne.pending_blocks = set()
+        self.mne.scroll_direction = 0
+        # Prevents that processing-parameters are changed while
+        # data is processed in another thread.
+        self.mne.process_lock = Lock()
+        # The maximum of the stim-channels over the recording
+        # (see _get_stim_norms).
+        self.mne.stim_norms = dict()
+        self.mne.stim_norms_lock = Lock()
+        # Range-changes are applied once per frame by a zero-delay timer,
+        # which fires after all pending events were processed.
+        self.mne.pending_updates = set()
+        self.mne.update_counts = dict(requested=0, coalesced=0, applied=0,
+                                      stale=0)
+        # With async_update the data of a changed time-range is computed
+        # in a separate thread. Every request gets a number to discard
+        # results of superseded requests.
+        self.mne.window_request = 0
+        self.mne.update_latencies = list()
+        self.mne.window_pool = QThreadPool()
+        self.mne.window_pool.setMaxThreadCount(1)
+        self.mne.frame_timer = QTimer(self)
+        self.mne.frame_timer.setSingleShot(True)
+        self.mne.frame_timer.setInterval(0)
+        self.mne.frame_timer.timeout.connect(self._apply_pending_updates)
 
         # Add Load-Progressbar for loading in a thread
         self.mne.load_prog_label = QLabel('Loading...')
@@ -1283,6 +3259,16 @@ class PyQtGraphPtyp(BrowserBase, QMainWindow, metaclass=_PGMetaClass):
         plt.sigYRangeChanged.connect(self.yrange_changed)
         vars(self.mne).update(plt=plt)
 
+        # Add item to draw all traces at once
+        if self.mne.render_mode == 'batched':
+            self.mne.batch_item = BatchedTraceItem(self.mne)
+            plt.addItem(self.mne.batch_item)
+        elif self.mne.render_mode == 'tiles':
+            self.mne.batch_item = TileTraceItem(self)
+            plt.addItem(self.mne.batch_item)
+        else:
+            self.mne.batch_item = None
+
         # Add traces
         for ch_idx in self.mne.picks:
             self.add_trace(ch_idx)
@@ -1405,28 +3391,37 @@ class PyQtGraphPtyp(BrowserBase, QMainWindow, metaclass=_PGMetaClass):
     def add_trace(self, ch_idx):
         trace = RawTraceItem(self.mne, ch_idx)
 
-        # Apply scaling
-        transform = self._get_scale_transform()
-        trace.setTransform(transform)
+        if self.mne.batch_item is None:
+            # Apply scaling
+            transform = self._get_scale_transform()
+            trace.setTransform(transform)
 
-        # Add Item early to have access to viewBox
-        self.mne.plt.addItem(trace)
+            # Add Item early to have access to viewBox
+            self.mne.plt.addItem(trace)
         self.mne.traces.append(trace)
 
         trace.sigClicked.connect(lambda tr, _: self.toggle_bad_channel(tr))
 
     def remove_trace(self, trace):
-        self.mne.plt.removeItem(trace)
+        if self.mne.batch_item is None:
+            self.mne.plt.removeItem(trace)
+        else:
+            self.mne.batch_item.data_changed()
         self.mne.traces.remove(trace)
 
     def scale_all(self, step):
         self.mne.scale_factor *= 2 ** step
+        if self.mne.batch_item is not None:
+            # The scaling is applied while building the paths.
+            self.mne.batch_item.invalidate()
+            return
         transform = self._get_scale_transform()
 
         for line in self.mne.traces:
             line.setTransform(transform)
 
     def hscroll(self, step):
+        self.mne.scroll_direction = np.sign(step)
         rel_step = step * self.mne.duration / self.mne.tsteps_per_window
         # Get current range and add step to it
         xmin, xmax = [i + rel_step for i in self.mne.viewbox.viewRange()[0]]
@@ -1571,32 +3566,77 @@ class PyQtGraphPtyp(BrowserBase, QMainWindow, metaclass=_PGMetaClass):
             self.mne.crosshair_h = None
 
     def xrange_changed(self, _, xrange):
-        # Update data
         self.mne.t_start = xrange[0]
         self.mne.duration = xrange[1] - xrange[0]
-        self._redraw(update_data=True)
 
         # Update Time-Bar
         self.mne.ax_hscroll.update_value_external(xrange)
 
-        # Update Overview-Bar
-        self.mne.overview_bar.update()
+        # Update data
+        self._schedule_update('x')
 
     def yrange_changed(self, _, yrange):
         if not self.mne.butterfly:
-            # Update picks and data
             self.mne.ch_start = np.clip(round(yrange[0]), 0,
                                         len(self.mne.ch_order)
                                         - self.mne.n_channels)
             self.mne.n_channels = round(yrange[1] - yrange[0] - 1)
-            self._update_picks()
-            self._update_data()
 
             # Update Channel-Bar
             self.mne.ax_vscroll.update_ch_start()
 
-            # Update Overview-Bar
-            self.mne.overview_bar.update()
+        # Update picks and data
+        self._schedule_update('y')
+
+    def _schedule_update(self, axis):
+        """Apply the change of the view-range (at the next frame)."""
+        self.mne.update_counts['requested'] += 1
+        if not self.mne.coalesce_updates:
+            self.mne.pending_updates.add(axis)
+            self._apply_pending_updates()
+        else:
+            if axis in self.mne.pending_updates:
+                # The previous range is superseded before it was drawn.
+                self.mne.update_counts['coalesced'] += 1
+            self.mne.pending_updates.add(axis)
+            if not self.mne.frame_timer.isActive():
+                self.mne.frame_timer.start()
+
+    def _flush_updates(self):
+        """Apply pending changes of the view-range immediately."""
+        self.mne.frame_timer.stop()
+        if len(self.mne.pending_updates) > 0:
+            self._apply_pending_updates()
+
+    def _apply_pending_updates(self):
+        axes = self.mne.pending_updates
+        self.mne.pending_updates = set()
+        if len(axes) == 0:
+            return
+        if 'x' in axes:
+            # Threads read the view-range from here (see LoadRunner).
+            self.mne.view_range = self._get_start_stop()
+        if 'y' in axes:
+            self._update_yrange()
+        if 'x' in axes:
+            if 'y' in axes and not self.mne.butterfly:
+                # The data was already updated for the new time-range
+                # when the channel-range changed (except in butterfly-mode).
+                self._redraw(update_data=False)
+            elif self.mne.async_update:
+                self._request_window()
+            else:
+                self._redraw(update_data=True)
+        self.mne.update_counts['applied'] += 1
+
+        # Update Overview-Bar
+        self.mne.overview_bar.update()
+
+    def _update_yrange(self):
+        if not self.mne.butterfly:
+            # Update picks and data
+            self._update_picks()
+            self._update_data()
 
         off_traces = [tr for tr in self.mne.traces
                       if tr.ch_idx not in self.mne.picks]
@@ -1628,86 +3668,165 @@ class PyQtGraphPtyp(BrowserBase, QMainWindow, metaclass=_PGMetaClass):
     # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # #
     # DATA HANDLING
     # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # #
-    def _apply_downsampling(self):
+    def _get_ds_factor(self):
+        """Get the Downsampling-Factor for the visible range."""
+        ds = self.mne.ds
+        # Auto-Downsampling from pyqtgraph
+        if ds == 'auto':
+            ds = 1
+            vb = getattr(self.mne, 'viewbox', None)
+            if vb is not None:
+                view_range = vb.viewRect()
+                # Use the sampling-interval instead of the times of the
+                # last window, which may be downsampled already.
+                dx = 1 / self.mne.info['sfreq']
+                x0 = view_range.left() / dx
+                x1 = view_range.right() / dx
+                width = vb.width()
+                if width != 0.0:
+                    # Auto-Downsampling with 5 samples per pixel
+                    ds = int(max(1, (x1 - x0) / (width * 5)))
+        elif not isinstance(ds, int):
+            ds = 1
+
+        return ds
+
+    def _apply_downsampling(self, times, data, view, remove_dc=False,
+                            cache=False):
         """
-        Get Downsampling-Factor and apply Downsampling
-        with one of multiple methods.
+        Apply Downsampling with one of multiple methods.
 
         The methods are taken from PlotDataItem in pyqtgraph
         and adjusted to multi-channel data.
+        The downsampling-factor and -method are taken from view
+        (see _get_view_snapshot).
+        If remove_dc is True, the DC-offset of the visible window
+        is removed in the same pass.
+        If cache is True, the result is cached for the window.
         """
+        ds = view['ds']
+        ds_method = view['ds_method']
 
-        # Get Downsampling-Factor
-        # Auto-Downsampling from pyqtgraph
-        if (self.mne.ds == 'auto' and
-                all([hasattr(self.mne, a) for a in ['viewbox', 'times']])):
-            vb = self.mne.viewbox
-            if vb is not None:
-                view_range = vb.viewRect()
+        # Apply Downsampling
+        if ds != 1:
+            # Caching is only activated for windows of preloaded
+            # or cached blocks of data.
+            if self.mne.ds_cache is not None and cache:
+                cache_key = (ds, ds_method, view['start'], view['stop'],
+                             view['generation'])
+                cached = self.mne.ds_cache.get(cache_key)
             else:
-                view_range = None
-            if view_range is not None and len(self.mne.times) > 1:
-                dx = float(self.mne.times[-1] - self.mne.times[0]) / (
-                        len(self.mne.times) - 1)
-                if dx != 0.0:
-                    x0 = view_range.left() / dx
-                    x1 = view_range.right() / dx
-                    width = vb.width()
-                    if width != 0.0:
-                        # Auto-Downsampling with 5 samples per pixel
-                        self.mne.ds = int(max(1, (x1 - x0) / (width * 5)))
-
-        if not isinstance(self.mne.ds, int):
-            self.mne.ds = 1
+                cache_key = None
+                cached = None
+            if cached is not None:
+                times, data = cached
+            else:
+                if 'start' in view:
+                    # Start the bins at multiples of ds from the first
+                    # sample, thus they don't shift on pans.
+                    offset = -view['start'] % ds
+                    times, data = times[offset:], data[:, offset:]
+                times, data = self._downsample_chunked(times, data, ds,
+                                                       ds_method, remove_dc)
+
+                if cache_key is not None:
+                    self.mne.ds_cache.put(cache_key, (times, data))
+
+        elif remove_dc:
+            data = data - data.mean(axis=1, keepdims=True)
+
+        # Compute the times only for the vertices.
+        return np.asarray(times), data
+
+    def _get_ds_chunk_size(self, ds):
+        """Get ds_chunk_size rounded to a multiple of ds."""
+        if self.mne.ds_chunk_size is None:
+            return None
+        return max(self.mne.ds_chunk_size // ds, 1) * ds
+
+    def _run_ds_kernel(self, times, data, ds, ds_method, remove_dc=False):
+        """Downsample with a registered kernel (see register_ds_kernel)."""
+        ds_kernel = self.mne.ds_kernels[ds_method]
+        if remove_dc and ds_kernel['dc_func'] is not None:
+            # DC-removal is done in the same pass as downsampling.
+            return ds_kernel['dc_func'](times, data, ds)
+        times_ds, data_ds = ds_kernel['func'](times, data, ds)
+        if remove_dc:
+            data_ds = data_ds - np.asarray(data).mean(axis=1, keepdims=True)
+
+        return times_ds, data_ds
+
+    def _downsample_chunked(self, times, data, ds, ds_method, remove_dc):
+        """Downsample in chunks of ds_chunk_size to bound the memory."""
+        chunk_size = self._get_ds_chunk_size(ds)
+        if chunk_size is None or data.shape[1] <= chunk_size \
+                or not self.mne.ds_kernels[ds_method]['block_cacheable']:
+            return self._run_ds_kernel(times, data, ds, ds_method, remove_dc)
+        chunks = [self._run_ds_kernel(times[idx:idx + chunk_size],
+                                      data[:, idx:idx + chunk_size], ds,
+                                      ds_method)
+                  for idx in range(0, data.shape[1], chunk_size)]
+        times_ds = np.concatenate([chunk[0] for chunk in chunks])
+        data_ds = np.concatenate([chunk[1] for chunk in chunks], axis=1)
+        if remove_dc:
+            data_ds -= np.asarray(data).mean(axis=1)[:, np.newaxis]
+
+        return times_ds, data_ds
+
+    def _get_ds_blocks(self, view, remove_dc):
+        """Downsample preloaded data from blocks cached across pans.
+
+        The blocks have ds_chunk_size samples (or 1024 bins) and are
+        aligned to the global grid of bins, thus they can be reused
+        for every window containing them.
+        Returns None if the window contains no full bin.
+        """
+        ds, ds_method = view['ds'], view['ds_method']
+        b0 = -(-view['start'] // ds)
+        b1 = view['stop'] // ds
+        if b1 <= b0:
+            return None
+        data = self.mne.global_data
+        times = self.mne.global_times
+        block_size = self._get_ds_chunk_size(ds) or 1024 * ds
+        bins_per_block = block_size // ds
+        first_block = b0 // bins_per_block
+        blocks = list()
+        for block_idx in range(first_block, (b1 - 1) // bins_per_block + 1):
+            cache_key = ('block', ds, ds_method, block_size, block_idx,
+                         view['generation'])
+            block = self.mne.ds_cache.get(cache_key)
+            if block is None:
+                block_start = block_idx * block_size
+                block_stop = block_start + block_size
+                block = self._run_ds_kernel(times[block_start:block_stop],
+                                            data[:, block_start:block_stop],
+                                            ds, ds_method)
+                self.mne.ds_cache.put(cache_key, block)
+            blocks.append(block)
+        # Slice the bins of the window.
+        bin_width = self.mne.ds_kernels[ds_method]['samples_per_bin']
+        first_idx = (b0 - first_block * bins_per_block) * bin_width
+        last_idx = first_idx + (b1 - b0) * bin_width
+        window_times = np.concatenate(
+            [block[0] for block in blocks])[first_idx:last_idx]
+        window_data = np.concatenate(
+            [block[1] for block in blocks], axis=1)[:, first_idx:last_idx]
+        if remove_dc:
+            pyramid = self.mne.ds_pyramid
+            if pyramid is not None:
+                mean = pyramid.get_mean(data, b0 * ds, b1 * ds)
+            else:
+                mean = np.asarray(data[:, b0 * ds:b1 * ds]).mean(axis=1)
+            window_data = window_data - mean[:, np.newaxis]
 
-        # Apply Downsampling
-        if self.mne.ds not in [None, 1]:
-            ds = self.mne.ds
-            times = self.mne.times
-            data = self.mne.data
-            n_ch = data.shape[0]
+        return window_times, window_data
 
-            if self.mne.enable_ds_cache and ds in self.mne.ds_cache:
-                # Caching is only activated if downsampling is applied
-                # on the preloaded data.
-                times, data = self.mne.ds_cache[ds]
-            else:
-                if self.mne.ds_method == 'subsample':
-                    times = times[::ds]
-                    data = data[:, ::ds]
-
-                elif self.mne.ds_method == 'mean':
-                    n = len(times) // ds
-                    # start of x-values
-                    # try to select a somewhat centered point
-                    stx = ds // 2
-                    times = times[stx:stx + n * ds:ds]
-                    rs_data = data[:, n * ds].reshape(n_ch, n, ds)
-                    data = rs_data.mean(axis=2)
-
-                elif self.mne.ds_method == 'peak':
-                    n = len(times) // ds
-                    # start of x-values
-                    # try to select a somewhat centered point
-                    stx = ds // 2
-
-                    x1 = np.empty((n, 2))
-                    x1[:] = times[stx:stx + n * ds:ds, np.newaxis]
-                    times = x1.reshape(n * 2)
-
-                    y1 = np.empty((n_ch, n, 2))
-                    y2 = data[:n * ds].reshape((n_ch, n, ds))
-                    y1[:, :, 0] = y2.max(axis=2)
-                    y1[:, :, 1] = y2.min(axis=2)
-                    data = y1.reshape((n_ch, n * 2))
-
-                # Only cache downsampled data if cache is enabled
-                # (may be not with big datasets)
-                if self.mne.enable_ds_cache and \
-                        self.mne.preload and self.mne.data_preloaded:
-                    self.mne.ds_cache[ds] = times, data
-
-            self.mne.times, self.mne.data = times, data
+    def _show_load_progress(self, n_chunks, n_bytes, throughput):
+        self.mne.load_progressbar.setValue(n_chunks)
+        self.mne.load_prog_label.setText(f'Loading... '
+                                         f'{n_bytes / 1e6:.1f} MB '
+                                         f'({throughput / 1e6:.1f} MB/s)')
 
     def _show_process(self, message):
         if self.mne.load_progressbar.isVisible():
@@ -1715,30 +3834,674 @@ class PyQtGraphPtyp(BrowserBase, QMainWindow, metaclass=_PGMetaClass):
             self.mne.load_prog_label.hide()
         self.statusBar().showMessage(message)
 
-    def _preload_finished(self):
-        self.statusBar().showMessage('Loading Finished', 5)
+    def _get_load_chunk_size(self, n_times):
+        """Get the samples of the chunks loaded by the LoadRunner.
+
+        The chunks are processed with the filter-pad on both sides
+        (see _load_processed), thus they are at least 4 times as long
+        as the pad to load at most 1.5 times the data.
+        """
+        if not self.mne.progressive_preload:
+            chunk_size = -(-n_times // 10)
+        else:
+            # Chunks of the visible duration (and at most 1000 chunks)
+            chunk_size = max(int(self.mne.duration * self.mne.info['sfreq']),
+                             -(-n_times // 1000))
+        return max(chunk_size, 4 * self._get_filter_pad(), 1)
+
+    def _window_loaded(self, start, stop):
+        """Check if the loaded chunks of the preload cover [start, stop)."""
+        loaded_mask = self.mne.loaded_mask
+        if loaded_mask is None:
+            return False
+        chunk_size = self.mne.load_chunk_size
+        first_chunk = max(start, 0) // chunk_size
+        last_chunk = -(-stop // chunk_size)
+
+        return bool(loaded_mask[first_chunk:last_chunk].all())
+
+    def _chunk_loaded(self, start, stop):
+        """Show the window as soon as the preload covers it."""
+        if self.mne.data_preloaded:
+            return
+        win_start, win_stop = self._get_start_stop()
+        if start < win_stop and stop > win_start \
+                and self._window_loaded(win_start, win_stop):
+            self._schedule_update('x')
+
+    def _preload_finished(self, load_runner):
+        if load_runner is not self.mne.load_runner:
+            # The signal of a cancelled preload arrived late.
+            return
+        self.mne.load_runner = None
+        # Not every preload emits processText (see _show_process).
+        self.mne.load_progressbar.hide()
+        self.mne.load_prog_label.hide()
+        if self.mne.display_clipped > 0:
+            # Don't hide that the stored data is clipped.
+            self.statusBar().showMessage(
+                f'Loading Finished ({self.mne.display_clipped} samples '
+                f'clipped by the int16-quantization, '
+                f'use display_dtype="float32" to avoid this)')
+        elif self.mne.ds_pyramid is not None:
+            pyramid_size = self.mne.ds_pyramid.nbytes / 1e6
+            self.statusBar().showMessage(f'Loading Finished '
+                                         f'(Pyramid: {pyramid_size:.1f} MB)',
+                                         5000)
+        else:
+            self.statusBar().showMessage('Loading Finished', 5000)
         self.mne.data_preloaded = True
 
         if self.mne.overview_mode == 'zscore':
             # Show loaded overview image
             self.mne.overview_bar.set_overview()
 
-    def _preload_in_thread(self):
+    def _estimate_footprint(self, mode):
+        """Estimate the memory (in bytes) of the components for a mode.
+
+        The modes are the preload_modes and "stream" for preload=False.
+        """
+        block_size = self.mne.block_size
+        n_channels = len(self.mne.ch_names)
+        if self.mne.is_epochs:
+            n_times = len(self.mne.inst.events) * len(self.mne.inst.times)
+        else:
+            n_times = len(self.mne.inst)
+        itemsize = self.mne.display_dtype.itemsize
+        data_bytes = n_channels * n_times * itemsize
+        footprint = dict()
+        if self.mne.enable_ds_cache:
+            footprint['ds_cache'] = self.mne.ds_cache_mb * 1e6
+        if self.mne.render_mode == 'tiles':
+            footprint['tile_cache'] = self.mne.tile_cache_mb * 1e6
+        if mode == 'window':
+            # The processed blocks (float64) of the region with the times
+            n_region = (2 * self.mne.preload_margin + 1) \
+                * self.mne.duration * self.mne.info['sfreq'] + 2 * block_size
+            footprint['data'] = (n_channels + 1) * n_region * 8
+            return footprint
+        elif mode == 'stream':
+            if self.mne.block_cache_mb and not self.mne.is_epochs:
+                footprint['block_cache'] = self.mne.block_cache_mb * 1e6
+            return footprint
+
+        if mode == 'ram':
+            footprint['data'] = data_bytes
+        elif mode == 'compressed':
+            footprint['data'] = data_bytes / _assumed_compression_ratio
+            footprint['hot_cache'] = self.mne.hot_cache_mb * 1e6
+        elif self.mne.is_epochs:
+            # Epochs are loaded at once before they are written.
+            footprint['data'] = data_bytes
+        else:
+            # Written pages of the memmap can be evicted by the OS, but the
+            # chunks in process and the dirty pages until the next flush
+            # (see _memmap_flush_chunks) stay in memory.
+            chunk_bytes = n_channels * itemsize \
+                * self._get_load_chunk_size(n_times)
+            footprint['data'] = chunk_bytes * (
+                self._get_preload_threads() + _memmap_flush_chunks)
+        if self.mne.use_ds_pyramid:
+            # Minima and maxima of all levels (twice the lowest level
+            # with bins of 8 samples) and the cumulative sums
+            n_bins = n_times / 8
+            footprint['pyramid'] = n_channels * n_bins * (4 * itemsize + 8)
+        if self.mne.overview_mode == 'zscore':
+            n_cols = QApplication.desktop().screenGeometry().width()
+            footprint['zscore'] = n_channels * n_cols * 8
+
+        return footprint
+
+    def _get_preload_plan(self):
+        """Choose how the data is preloaded to fit into max_ram.
+
+        The first of preloading into RAM, into a memmap (if the disk has
+        enough space), into compressed chunks, into a region around the
+        view (both only raw-data) and streaming from the file, which fits
+        into max_ram, is used.
+        Without max_ram, the mode as set by preload/preload_mode is used.
+        """
+        if not self.mne.preload:
+            modes = ['stream']
+        elif self.mne.max_ram is None:
+            modes = [self.mne.preload_mode]
+        elif self.mne.is_epochs:
+            # Epochs are always preloaded into RAM.
+            modes = ['ram', 'stream']
+        else:
+            modes = ['ram']
+            if self.mne.memmap_path is not None:
+                memmap_dir = os.path.dirname(
+                    os.path.abspath(self.mne.memmap_path))
+            else:
+                memmap_dir = tempfile.gettempdir()
+            n_bytes = len(self.mne.ch_names) * len(self.mne.inst) \
+                * self.mne.display_dtype.itemsize
+            if shutil.disk_usage(memmap_dir).free > n_bytes:
+                modes.append('memmap')
+            modes += ['compressed', 'window', 'stream']
+        for mode in modes:
+            footprint = self._estimate_footprint(mode)
+            total = sum(footprint.values())
+            if self.mne.max_ram is None or total <= self.mne.max_ram * 1e6:
+                break
+        else:
+            logger.warning(f'The estimated memory of {total / 1e6:.1f} MB '
+                           f'exceeds max_ram even without preload.')
+        plan = dict(mode=mode, total_mb=round(total / 1e6, 1),
+                    max_ram_mb=self.mne.max_ram,
+                    footprint_mb={name: round(n_bytes / 1e6, 1)
+                                  for name, n_bytes in footprint.items()})
+        logger.info(f'Preload-plan: {plan}')
+
+        return plan
+
+    def _get_preload_buffer(self, n_channels, n_times):
+        """Allocate the buffer which is filled by the LoadRunner."""
+        shape = (n_channels, n_times)
+        if self.mne.preload_mode == 'memmap':
+            if self.mne.memmap_path is None:
+                fd, path = tempfile.mkstemp(suffix='.dat', prefix='mne_pg_')
+                os.close(fd)
+                self.mne.memmap_tmp_path = path
+            else:
+                path = self.mne.memmap_path
+                memmap_info = self._read_memmap_info()
+                if memmap_info is not None \
+                        and memmap_info['key'] == self._get_memmap_key(shape):
+                    # Reuse the complete file written by another browser.
+                    if memmap_info['display_scale'] is not None:
+                        self.mne.display_scale = np.array(
+                            memmap_info['display_scale'])
+                        self.mne.display_offset = np.array(
+                            memmap_info['display_offset'])
+                    return np.memmap(path, dtype=self.mne.display_dtype,
+                                     mode='r', shape=shape)
+                # The file is incomplete until it is written.
+                if memmap_info is not None:
+                    os.remove(f'{path}.json')
+            return np.memmap(path, dtype=self.mne.display_dtype, mode='w+',
+                             shape=shape)
+        elif self.mne.preload_mode == 'compressed':
+            return CompressedChunkStore(
+                n_channels, n_times, self.mne.display_dtype,
+                self.mne.compression_chunk_size, self.mne.compression_codec,
+                self.mne.compression_level, self.mne.hot_cache_mb)
+        else:
+            return np.empty(shape, dtype=self.mne.display_dtype)
+
+    def _get_memmap_key(self, shape):
+        """Get the key of the data written into memmap_path."""
+        inst = self.mne.inst
+        fnames = [str(fname) for fname in getattr(inst, 'filenames', [])]
+        return DiskCache.get_key(fnames, inst.first_samp, shape,
+                                 self.mne.info['sfreq'],
+                                 self._get_preload_params())
+
+    def _read_memmap_info(self):
+        """Read the description of a complete file in memmap_path."""
+        info_fname = f'{self.mne.memmap_path}.json'
+        if not os.path.isfile(info_fname):
+            return None
+        with open(info_fname) as file:
+            return json.load(file)
+
+    def _write_memmap_info(self, shape):
+        """Mark the file in memmap_path as complete for other browsers."""
+        memmap_info = dict(key=self._get_memmap_key(shape),
+                           display_scale=None, display_offset=None)
+        if self.mne.display_scale is not None:
+            memmap_info['display_scale'] = self.mne.display_scale.tolist()
+            memmap_info['display_offset'] = self.mne.display_offset.tolist()
+        info_fname = f'{self.mne.memmap_path}.json'
+        tmp_fname = f'{info_fname}.{os.getpid()}.tmp'
+        with open(tmp_fname, 'w') as file:
+            json.dump(memmap_info, file)
+        os.replace(tmp_fname, info_fname)
+
+    def _store_display_data(self, data_chunk, out):
+        """Write the inverted data into out (with display_dtype).
+
+        For int16, the scale and offset of each channel are fitted before
+        (see _fit_quantization) or to this data. Values outside their range
+        are clipped and counted in display_clipped.
+        """
+        if out.dtype != np.int16:
+            np.negative(data_chunk, out=out)
+            return
+        data_chunk = -np.asarray(data_chunk, dtype=np.float64)
+        if self.mne.display_scale is None:
+            self._set_quantization(np.nanmin(data_chunk, axis=1),
+                                   np.nanmax(data_chunk, axis=1))
+        data_chunk -= self.mne.display_offset[:, np.newaxis]
+        data_chunk /= self.mne.display_scale[:, np.newaxis]
+        self.mne.display_clipped += np.count_nonzero(
+            np.abs(data_chunk) > _int16_max)
+        np.clip(data_chunk, -_int16_max, _int16_max, out=data_chunk)
+        np.rint(data_chunk, out=out, casting='unsafe')
+
+    def _set_quantization(self, ch_min, ch_max):
+        """Set scale and offset of the int16-quantization per channel."""
+        self.mne.display_offset = (ch_max + ch_min) / 2
+        # Leave headroom for larger values than estimated.
+        half_range = (ch_max - ch_min) / 2 * _quantize_headroom
+        half_range[~(half_range > 0)] = 1.
+        self.mne.display_scale = half_range / _int16_max
+
+    def _fit_quantization(self, picks):
+        """Fit the int16-quantization to the range of the whole recording.
+
+        The range is estimated from segments spread evenly over the
+        recording and processed like the preload (call with stashed
+        remove_dc), thus later sections with larger amplitudes than
+        the first loaded chunk are not clipped.
+        """
+        n_times = len(self.mne.inst)
+        segment_size = min(int(self.mne.info['sfreq']), n_times)
+        n_segments = min(_quantize_n_segments, n_times // segment_size)
+        ch_min = np.full(len(picks), np.inf)
+        ch_max = np.full(len(picks), -np.inf)
+        for start in np.linspace(0, n_times - segment_size,
+                                 n_segments).astype(int):
+            _, data = self._load_processed(start, start + segment_size,
+                                           picks, stashed_dc=True)
+            # The display-data is inverted.
+            ch_min = np.fmin(ch_min, -np.nanmax(data, axis=1))
+            ch_max = np.fmax(ch_max, -np.nanmin(data, axis=1))
+        self._set_quantization(ch_min, ch_max)
+
+    def _dequantize(self, data, remove_dc=False, rows=None):
+        """Convert downsampled int16-quantized data back.
+
+        Without remove_dc, the offset of the channels is added.
+        """
+        if self.mne.display_scale is None:
+            return data
+        scale = self.mne.display_scale
+        offset = self.mne.display_offset
+        if rows is not None:
+            scale, offset = scale[rows], offset[rows]
+        data = data * scale[:, np.newaxis]
+        if not remove_dc:
+            data += offset[:, np.newaxis]
+
+        return data
+
+    def _release_preload(self):
+        """Remove previously loaded data (and a temporary memmap-file)."""
         self.mne.data_preloaded = False
-        # Remove previously loaded data
-        if all([hasattr(self.mne, st)
-                for st in ['global_data', 'global_times']]):
-            del self.mne.global_data, self.mne.global_times
+        # Invalidate data cached from the old data.
+        self.mne.processing_generation += 1
+        if self.mne.ds_cache is not None:
+            self.mne.ds_cache.clear()
+        self.mne.incr_window.clear()
+        self.mne.ds_pyramid = None
+        self.mne.loaded_mask = None
+        self.mne.display_scale = None
+        self.mne.display_offset = None
+        self.mne.display_clipped = 0
+        for attr in ['global_data', 'global_times']:
+            if hasattr(self.mne, attr):
+                delattr(self.mne, attr)
+        if self.mne.memmap_tmp_path is not None:
+            try:
+                os.remove(self.mne.memmap_tmp_path)
+            except OSError:
+                # On Windows the file can't be removed while it is still
+                # mapped somewhere.
+                logger.warning(f'Temporary file '
+                               f'{self.mne.memmap_tmp_path} '
+                               f'could not be removed.')
+            self.mne.memmap_tmp_path = None
+
+    def _preload_in_thread(self):
+        self.cancel_preload()
+        if self.mne.stopping_runner is not None:
+            # Start when the cancelled preload stopped
+            # (see _preload_cancelled).
+            self.mne.restart_preload = True
+            return
+        self._release_preload()
         # Start preload thread
         self.mne.load_progressbar.show()
         self.mne.load_prog_label.show()
+        self.mne.view_range = self._get_start_stop()
         load_runner = LoadRunner(self)
-        load_runner.sigs.loadProgress.connect(self.mne.
-                                              load_progressbar.setValue)
+        load_runner.sigs.loadProgress.connect(self._show_load_progress)
+        load_runner.sigs.chunkLoaded.connect(self._chunk_loaded)
         load_runner.sigs.processText.connect(self._show_process)
-        load_runner.sigs.loadingFinished.connect(self._preload_finished)
+        load_runner.sigs.loadingFinished.connect(
+            partial(self._preload_finished, load_runner))
+        load_runner.sigs.loadingCancelled.connect(
+            partial(self._preload_cancelled, load_runner))
+        self.mne.load_runner = load_runner
         QThreadPool.globalInstance().start(load_runner)
 
+    def cancel_preload(self):
+        """Stop a running preload and release the partially loaded data.
+
+        Loading stops after the chunks which are currently processed.
+        This doesn't block, the data is released when the LoadRunner
+        stopped (see _preload_cancelled).
+        """
+        load_runner = self.mne.load_runner
+        if load_runner is None:
+            return
+        self.mne.load_runner = None
+        load_runner.cancelled = True
+        # Late signals of the cancelled runner must not show up
+        # (e.g. in the progress of the next preload).
+        for signal in [load_runner.sigs.loadProgress,
+                       load_runner.sigs.chunkLoaded,
+                       load_runner.sigs.processText,
+                       load_runner.sigs.loadingFinished]:
+            signal.disconnect()
+        self.mne.load_progressbar.hide()
+        self.mne.load_prog_label.hide()
+        # A runner which didn't start yet is removed from the queue.
+        if QThreadPool.globalInstance().tryTake(load_runner) \
+                or load_runner.done.is_set():
+            self._release_preload()
+        else:
+            self.mne.stopping_runner = load_runner
+        logger.info('Preload cancelled')
+
+    def _preload_cancelled(self, load_runner):
+        if load_runner is not self.mne.stopping_runner:
+            return
+        self.mne.stopping_runner = None
+        self._release_preload()
+        if self.mne.restart_preload:
+            self.mne.restart_preload = False
+            self._preload_in_thread()
+
+    def _get_disk_cache_key(self):
+        """Get the key of the preloaded data in the disk-cache.
+
+        None is returned if there is no disk-cache or the data
+        is not from raw-files.
+        """
+        if self.mne.disk_cache is None or self.mne.is_epochs:
+            return None
+        inst = self.mne.inst
+        if getattr(inst, 'preload', False):
+            # The data in memory might be changed from the files.
+            # Hash the data in chunks of columns (of about 16 MB)
+            # to avoid a copy of the whole data.
+            data = inst._data
+            n_cols = max(2 ** 24 // max(data.shape[0] * data.itemsize, 1), 1)
+            hasher = hashlib.sha1()
+            for start in range(0, data.shape[1], n_cols):
+                hasher.update(np.ascontiguousarray(
+                    data[:, start:start + n_cols]))
+            content_hashes = [hasher.hexdigest()]
+        else:
+            fnames = [fname for fname in getattr(inst, 'filenames', [])
+                      if fname is not None]
+            if len(fnames) == 0:
+                return None
+            content_hashes = [self.mne.disk_cache.get_file_hash(fname)
+                              for fname in fnames]
+
+        return self.mne.disk_cache.get_key(
+            content_hashes, type(inst).__name__, inst.first_samp, len(inst),
+            self.mne.info['sfreq'], self._get_preload_params())
+
+    def _get_preload_params(self):
+        """Get the parameters, which change the preloaded data.
+
+        Besides channels, projections and filter, these are the scalings
+        (and clipping) applied by _process_data and the storage with
+        display_dtype (including the fit of the int16-quantization).
+        """
+        return (tuple(self.mne.ch_order), list(self.mne.ch_types),
+                tuple(self.mne.projs_on),
+                getattr(self.mne, 'projector', None), self.mne.filter_coefs,
+                dict(self.mne.scalings),
+                getattr(self.mne, 'unit_scalings', None),
+                getattr(self.mne, 'clipping', None),
+                list(getattr(self.mne, 'whitened_ch_names', [])),
+                list(self.mne.info['bads']), str(self.mne.display_dtype),
+                _quantize_headroom, _quantize_n_segments)
+
+    def _get_processing_state(self):
+        """Get the parameters, which change the processed data."""
+        return (tuple(self.mne.picks), tuple(self.mne.projs_on),
+                tuple(self.mne.info['bads']))
+
+    def _get_filter_pad(self):
+        """Get the samples to add on both sides of a block for filtering.
+
+        For IIR-filters, this is the length after which the impulse-response
+        decayed (as estimated by mne for padlen), thus the transients of the
+        block-edges are cut off with the pad.
+        """
+        filter_coefs = self.mne.filter_coefs
+        if filter_coefs is None:
+            return 0
+        elif isinstance(filter_coefs, np.ndarray):
+            # FIR
+            return len(filter_coefs)
+        elif 'padlen' in filter_coefs:
+            # IIR
+            return int(filter_coefs['padlen'])
+        elif 'sos' in filter_coefs:
+            return int(estimate_ringing_samples(filter_coefs['sos']))
+        else:
+            return int(estimate_ringing_samples((filter_coefs['b'],
+                                                 filter_coefs['a'])))
+
+    def _load_block(self, block_idx, picks):
+        """Load and process one block (without removing DC)."""
+        n_times = len(self.mne.inst)
+        start = block_idx * self.mne.block_size
+        stop = min(start + self.mne.block_size, n_times)
+        times, data = self._load_processed(start, stop, picks)
+        # Invert Data to be displayed from top on inverted Y-Axis.
+        np.negative(data, out=data)
+        self.mne.block_itemsizes = (times.dtype.itemsize,
+                                    data.dtype.itemsize)
+
+        return times, data
+
+    def _get_remove_dc(self):
+        """Get remove_dc as set by the user (call with process_lock).
+
+        While preloading, remove_dc is deactivated for processing.
+        """
+        if self.mne.stashed_remove_dc is not None:
+            return self.mne.stashed_remove_dc
+        return self.mne.remove_dc
+
+    def _stash_remove_dc(self):
+        """Deactivate DC-removal in processing for the preload.
+
+        Calls can be nested (e.g. by benchmarks while preloading), the
+        user-setting is restored by the last _restore_remove_dc.
+        """
+        with self.mne.process_lock:
+            if self.mne.dc_stash_count == 0:
+                self.mne.stashed_remove_dc = self.mne.remove_dc
+                self.mne.remove_dc = False
+            self.mne.dc_stash_count += 1
+
+    def _restore_remove_dc(self):
+        with self.mne.process_lock:
+            self.mne.dc_stash_count -= 1
+            if self.mne.dc_stash_count == 0:
+                self.mne.remove_dc = self.mne.stashed_remove_dc
+                self.mne.stashed_remove_dc = None
+
+    def _get_preload_threads(self):
+        n_threads = self.mne.preload_threads
+        if n_threads == -1:
+            n_threads = QThread.idealThreadCount()
+        return max(n_threads, 1)
+
+    def _get_stim_norms(self, stim_picks):
+        """Get the maximum of stim-channels over the whole recording.
+
+        The maxima are read in chunks once and then kept.
+        """
+        with self.mne.stim_norms_lock:
+            missing = [pick for pick in stim_picks
+                       if pick not in self.mne.stim_norms]
+            if len(missing) > 0:
+                n_times = len(self.mne.inst)
+                chunk_size = -(-n_times // 10)
+                ch_max = np.full(len(missing), -np.inf)
+                for start in range(0, n_times, chunk_size):
+                    data = self.mne.inst.get_data(
+                        picks=missing, start=start,
+                        stop=min(start + chunk_size, n_times))
+                    ch_max = np.fmax(ch_max, np.nanmax(data, axis=1))
+                # Like in _process_data
+                ch_max[~np.isfinite(ch_max) | (ch_max == 0)] = 1
+                self.mne.stim_norms.update(zip(missing, ch_max))
+
+            return np.array([self.mne.stim_norms[pick]
+                             for pick in stim_picks])
+
+    def _load_processed(self, start, stop, picks, stashed_dc=False,
+                        recording_stims=True):
+        """Load and process [start, stop) (without removing DC).
+
+        With stashed_dc, DC-removal was already deactivated for the
+        preload (see _stash_remove_dc) and multiple threads can process
+        in parallel. With recording_stims, the stim-channels are scaled
+        by their maximum over the recording instead of over [start, stop)
+        (like by _process_data), thus the chunks of the preload and the
+        blocks fit together.
+        """
+        n_times = self.mne.n_times
+        # Load with overlap to avoid filter-artifacts at the block-edges
+        # (the epochs of the view are filtered separately).
+        pad = 0 if self.mne.is_epochs else self._get_filter_pad()
+        pad_start = max(start - pad, 0)
+        pad_stop = min(stop + pad, n_times)
+        data, times = self._load_data(pad_start, pad_stop)
+        # _load_data adds one sample to the requested range.
+        data = data[:, :pad_stop - pad_start]
+        picks = np.asarray(picks)
+        stims = np.flatnonzero(self.mne.ch_types[picks] == 'stim')
+        if recording_stims and len(stims) > 0:
+            # The norms applied by _process_data (stim-channels are
+            # neither projected nor filtered).
+            range_norms = data[picks[stims]].max(axis=-1)
+            range_norms[range_norms == 0] = 1
+        else:
+            stims = stims[:0]
+        if stashed_dc:
+            data = self._process_data(data, pad_start, pad_stop, picks)
+        else:
+            with self.mne.process_lock:
+                stashed_remove_dc = self.mne.remove_dc
+                self.mne.remove_dc = False
+                data = self._process_data(data, pad_start, pad_stop, picks)
+                self.mne.remove_dc = stashed_remove_dc
+        if len(stims) > 0:
+            data[stims] *= (range_norms / self._get_stim_norms(
+                picks[stims]))[:, np.newaxis]
+
+        return (times[start - pad_start:stop - pad_start],
+                data[:, start - pad_start:stop - pad_start])
+
+    def _get_window_from_blocks(self, start, stop, state=None):
+        """Assemble the window [start, stop) from cached blocks."""
+        start = max(start, 0)
+        stop = min(stop, len(self.mne.inst))
+        if state is None:
+            state = self._get_processing_state()
+        picks = np.asarray(state[0])
+        block_size = self.mne.block_size
+        times_list = list()
+        data_list = list()
+        for block_idx in range(start // block_size,
+                               (stop - 1) // block_size + 1):
+            key = (block_idx, state)
+            block = self.mne.block_cache.get(key)
+            if block is None:
+                block = self._load_block(block_idx, picks)
+                self.mne.block_cache.put(key, block)
+            block_start = block_idx * block_size
+            times_list.append(block[0][max(start - block_start, 0):
+                                       stop - block_start])
+            data_list.append(block[1][:, max(start - block_start, 0):
+                                      stop - block_start])
+        self._prefetch_blocks(start, stop, state)
+
+        return np.concatenate(times_list), np.concatenate(data_list, axis=1)
+
+    def _prefetch_blocks(self, start, stop, state):
+        """Process the next blocks in scrolling-direction in a thread."""
+        if self.mne.preload_window:
+            self._shift_preload_window(start, stop, state)
+            return
+        if self.mne.scroll_direction == 0 or self.mne.prefetch_blocks == 0:
+            return
+        block_size = self.mne.block_size
+        n_blocks = -(-len(self.mne.inst) // block_size)
+        if self.mne.scroll_direction > 0:
+            first_idx = (stop - 1) // block_size + 1
+            block_idxs = range(first_idx,
+                               first_idx + self.mne.prefetch_blocks)
+        else:
+            first_idx = start // block_size - 1
+            block_idxs = range(first_idx,
+                               first_idx - self.mne.prefetch_blocks, -1)
+        block_idxs = [bi for bi in block_idxs if 0 <= bi < n_blocks
+                      and (bi, state) not in self.mne.block_cache
+                      and (bi, state) not in self.mne.pending_blocks]
+        if len(block_idxs) > 0:
+            self.mne.pending_blocks.update([(bi, state)
+                                            for bi in block_idxs])
+            block_runner = BlockRunner(self, block_idxs, state)
+            QThreadPool.globalInstance().start(block_runner)
+
+    def _shift_preload_window(self, start, stop, state):
+        """Keep the processed blocks of the region around the view.
+
+        Blocks outside of preload_margin windows before and after the view
+        are released and the missing blocks are processed in a thread
+        (the blocks closest to the view first). If the region would exceed
+        the planned memory (window_budget) after zooming out, the margin
+        is reduced.
+        """
+        block_size = self.mne.block_size
+        n_blocks = -(-len(self.mne.inst) // block_size)
+        times_itemsize, data_itemsize = self.mne.block_itemsizes
+        block_bytes = block_size * (len(state[0]) * data_itemsize
+                                    + times_itemsize)
+        view_first = max(start, 0) // block_size
+        view_last = (stop - 1) // block_size
+        margin = -(-int(self.mne.preload_margin * (stop - start))
+                   // block_size)
+        # The blocks of the view are kept in any case.
+        max_margin = int(self.mne.window_budget // block_bytes
+                         - (view_last - view_first + 1)) // 2
+        margin = min(margin, max(max_margin, 0))
+        first_idx = max(view_first - margin, 0)
+        last_idx = min(view_last + margin, n_blocks - 1)
+        self.mne.window_region = (first_idx, last_idx, state)
+        for block_idx, block_state in self.mne.block_cache.keys():
+            if block_state != state \
+                    or not first_idx <= block_idx <= last_idx:
+                self.mne.block_cache.pop((block_idx, block_state))
+        # The budget follows the region (when zooming in or out).
+        self.mne.block_cache.max_bytes = \
+            (last_idx - first_idx + 1) * block_bytes
+        view_idx = start // block_size
+        block_idxs = sorted(range(first_idx, last_idx + 1),
+                            key=lambda bi: abs(bi - view_idx))
+        block_idxs = [bi for bi in block_idxs
+                      if (bi, state) not in self.mne.block_cache
+                      and (bi, state) not in self.mne.pending_blocks]
+        if len(block_idxs) > 0:
+            self.mne.pending_blocks.update([(bi, state)
+                                            for bi in block_idxs])
+            block_runner = BlockRunner(self, block_idxs, state)
+            QThreadPool.globalInstance().start(block_runner)
+
     def _get_decim(self):
         if self.mne.decim != 1:
             self.mne.decim_data = np.ones_like(self.mne.picks)
@@ -1746,66 +4509,177 @@ class PyQtGraphPtyp(BrowserBase, QMainWindow, metaclass=_PGMetaClass):
             self.mne.decim_data[data_picks_mask] = self.mne.decim
             # decim can vary by channel type,
             # so compute different `times` vectors
-            self.mne.decim_times = {decim_value: self.mne.times[::decim_value]
+            self.mne.decim_times = {decim_value: self.mne.times[...,
+                                                                ::decim_value]
                                                  + self.mne.first_time for
                                     decim_value in
                                     set(self.mne.decim_data)}
 
-    def _update_data(self):
+    def _update_processing_generation(self):
+        """Count up the generation if the processed data changes."""
+        with self.mne.process_lock:
+            remove_dc = self._get_remove_dc()
+        state = self._get_processing_state()
+        if self.mne.data_preloaded:
+            # Preloaded data contains all channels.
+            state = state[1:]
+        state += (remove_dc, self.mne.data_preloaded)
+        if state != self.mne.processing_state:
+            self.mne.processing_state = state
+            self.mne.processing_generation += 1
+
+    def _get_view_snapshot(self):
+        """Get the parameters, which define the data of the view."""
+        start, stop = self._get_start_stop()
+        with self.mne.process_lock:
+            remove_dc = self._get_remove_dc()
         if self.mne.data_preloaded:
-            # get start/stop-samples
-            start, stop = self._get_start_stop()
-            self.mne.times = self.mne.global_times[start:stop]
-            self.mne.data = self.mne.global_data[:, start:stop]
+            source = 'preload'
+        elif self._window_loaded(start, stop):
+            # The preload is not finished, but covers the window.
+            source = 'partial'
+        elif self.mne.block_cache is not None:
+            source = 'blocks'
+        else:
+            source = 'stream'
+        return dict(start=start, stop=stop, ds=self._get_ds_factor(),
+                    ds_method=self.mne.ds_method, remove_dc=remove_dc,
+                    source=source, state=self._get_processing_state(),
+                    generation=self.mne.processing_generation,
+                    request=self.mne.window_request,
+                    t_request=perf_counter())
+
+    def _compute_window(self, view):
+        """Compute times and data of the window from a view-snapshot.
+
+        Only the snapshot and the (read-only) data-sources are used,
+        thus this can run in a separate thread.
+        """
+        times, data = self._compute_stored_window(view)
+        if view['source'] == 'preload':
+            data = self._dequantize(data, view['remove_dc'])
+        elif view['source'] == 'partial':
+            data = self._dequantize(data, view['remove_dc'],
+                                    self._get_preload_rows(view['state'][0]))
+
+        return times, data
+
+    def _compute_stored_window(self, view):
+        """Compute the window in the dtype of the stored data."""
+        start, stop = view['start'], view['stop']
+        remove_dc = view['remove_dc']
+        pyramid = self.mne.ds_pyramid
+        if view['source'] == 'preload' and pyramid is not None \
+                and view['ds_method'] == 'peak' \
+                and view['ds'] >= pyramid.min_ds:
+            # Slice the level of the pyramid closest to the
+            # downsampling-factor, thus the cost only depends
+            # on the pixel-width of the view.
+            idxs, data = pyramid.get_window(start, stop, view['ds'])
+            times = self.mne.global_times[idxs]
 
             # remove DC locally
-            if self.mne.remove_dc:
-                self.mne.data = self.mne.data - \
-                                self.mne.data.mean(axis=1, keepdims=True)
+            if remove_dc:
+                data = data - pyramid.get_mean(
+                    self.mne.global_data, start, stop)[:, np.newaxis]
+
+            return times, data
+
+        bin_local = self.mne.ds_kernels[view['ds_method']]['block_cacheable']
+        if view['source'] == 'preload' and self.mne.incremental_update \
+                and view['ds'] > 1 and bin_local:
+            # Only compute the bins entering the window on pans.
+            window = self.mne.incr_window.get_window(
+                self.mne.global_times, self.mne.global_data, start, stop,
+                view['ds'], view['ds_method'], remove_dc,
+                view['generation'])
+            if window is not None:
+                return window
+
+        if view['source'] == 'preload' and view['ds'] > 1 \
+                and self.mne.ds_cache is not None and bin_local:
+            # Reuse the downsampled blocks of previous windows.
+            window = self._get_ds_blocks(view, remove_dc)
+            if window is not None:
+                return window
+
+        if view['source'] == 'preload':
+            times = self.mne.global_times[start:stop]
+            data = self.mne.global_data[:, start:stop]
+        elif view['source'] == 'partial':
+            # Only the picked channels as without preload.
+            rows = self._get_preload_rows(view['state'][0])
+            times = self.mne.global_times[start:stop]
+            data = self.mne.global_data[rows, start:stop]
+        elif view['source'] == 'blocks':
+            times, data = self._get_window_from_blocks(start, stop,
+                                                       view['state'])
         else:
-            super()._update_data()
-
+            # Padded for the filter like the blocks, but the stim-channels
+            # are scaled in the window (like by BrowserBase._update_data).
+            times, data = self._load_processed(
+                start, stop, np.asarray(view['state'][0]),
+                recording_stims=False)
             # Invert Data to be displayed from top on inverted Y-Axis.
-            self.mne.data *= -1
+            data *= -1
+
+        # Apply Downsampling and remove DC locally for preloaded
+        # or cached data.
+        return self._apply_downsampling(
+            times, data, view, remove_dc=remove_dc,
+            cache=view['source'] in ('preload', 'blocks'))
+
+    def _get_preload_rows(self, picks):
+        """Get the rows of the channels in the preloaded data."""
+        order_pos = {ch_idx: pos for pos, ch_idx
+                     in reversed(list(enumerate(self.mne.ch_order)))}
+
+        return np.array([order_pos[pick] for pick in picks], dtype=int)
+
+    def _update_data(self):
+        self._update_processing_generation()
+        # Results of pending asynchronous requests are outdated now.
+        self.mne.window_request += 1
+        view = self._get_view_snapshot()
+        # The same as computed with async_update.
+        self.mne.times, self.mne.data = self._compute_window(view)
 
         # Get decim
         self._get_decim()
 
-        # Apply Downsampling (if enabled)
-        self._apply_downsampling()
+    def _request_window(self):
+        """Compute the data of the view in a separate thread.
 
-    def _get_zscore(self, data):
+        The last frame is shown until the result arrives. Results of
+        requests superseded in the meantime are discarded.
+        """
+        self._update_processing_generation()
+        self.mne.window_request += 1
+        view = self._get_view_snapshot()
+        window_runner = WindowRunner(self, view)
+        window_runner.sigs.windowReady.connect(self._window_ready)
+        self.mne.window_pool.start(window_runner)
+
+    def _window_ready(self, view, times, data):
+        if view['request'] != self.mne.window_request \
+                or view['generation'] != self.mne.processing_generation:
+            self.mne.update_counts['stale'] += 1
+            return
+        self.mne.times, self.mne.data = times, data
+        self._get_decim()
+        self._redraw(update_data=False)
+        self.mne.update_latencies.append(perf_counter() - view['t_request'])
+
+    def _get_zscore(self, data, max_pixel_width):
         # Reshape data to reasonable size for display
-        max_pixel_width = QApplication.desktop().screenGeometry().width()
         collapse_by = data.shape[1] // max_pixel_width
-        data = data[:, :max_pixel_width * collapse_by]
-        data = data.reshape(data.shape[0], max_pixel_width, collapse_by)
-        data = data.mean(axis=2)
-        z = zscore(data, axis=1)
-
-        zmin = np.min(z, axis=1)
-        zmax = np.max(z, axis=1)
-
-        # Convert into RGBA
-        zrgba = np.empty((*z.shape, 4))
-        for row_idx, row in enumerate(z):
-            for col_idx, value in enumerate(row):
-                if math.isnan(value):
-                    value = 0
-                if value == 0:
-                    rgba = [0, 0, 0, 0]
-                elif value < 0:
-                    alpha = int(255 * value / abs(zmin[row_idx]))
-                    rgba = [0, 0, 255, alpha]
-                else:
-                    alpha = int(255 * value / zmax[row_idx])
-                    rgba = [255, 0, 0, alpha]
+        data = self.mne.kernels['column_means'](data, max_pixel_width,
+                                                collapse_by)
+        self._set_zscore(data)
 
-                zrgba[row_idx, col_idx] = rgba
-
-        zrgba = np.require(zrgba, np.uint8, 'C')
-
-        self.mne.zscore_rgba = zrgba
+    def _set_zscore(self, col_means):
+        z = zscore(col_means, axis=1)
+        self.mne.zscore_rgba = _zscore_rgba(z)
 
     # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # #
     # ANNOTATIONS
@@ -1949,10 +4823,17 @@ class PyQtGraphPtyp(BrowserBase, QMainWindow, metaclass=_PGMetaClass):
             self.mne.plt.setYRange(self.mne.ch_start,
                                    self.mne.ch_start + self.mne.n_channels + 1,
                                    padding=0)
+        # The traces have to be adjusted to the new range before drawing.
+        self._flush_updates()
         self._draw_traces()
 
     def _toggle_dc(self):
-        self.mne.remove_dc = not self.mne.remove_dc
+        with self.mne.process_lock:
+            if self.mne.stashed_remove_dc is not None:
+                # It is restored when the preload is finished.
+                self.mne.stashed_remove_dc = not self.mne.stashed_remove_dc
+            else:
+                self.mne.remove_dc = not self.mne.remove_dc
         self._redraw()
 
     def _toggle_time_format(self):
@@ -2067,6 +4948,13 @@ class PyQtGraphPtyp(BrowserBase, QMainWindow, metaclass=_PGMetaClass):
         elif event.key() == Qt.Key_O:
             self._toggle_overview_bar()
 
+    def keyReleaseEvent(self, event):
+        # Stop prefetching when the arrow-key is released
+        # (and not just repeated).
+        if event.key() in [Qt.Key_Left, Qt.Key_Right] \
+                and not event.isAutoRepeat():
+            self.mne.scroll_direction = 0
+
     def _draw_traces(self):
         # Update data in traces
         for trace in self.mne.traces:
@@ -2085,6 +4973,8 @@ class PyQtGraphPtyp(BrowserBase, QMainWindow, metaclass=_PGMetaClass):
     def _fake_keypress(self, key, fig=None):
         fig = fig or self
         QTest.keyPress(fig, qt_key_mapping[key])
+        # Apply the range-changes for tests checking the view right after.
+        self._flush_updates()
 
     def _fake_click(self, point, fig=None, ax=None,
                     xform='ax', button=1, kind='press'):
@@ -2135,6 +5025,8 @@ class PyQtGraphPtyp(BrowserBase, QMainWindow, metaclass=_PGMetaClass):
 
         # Waiting some time for events to be processed.
         QTest.qWait(10)
+        # Apply the range-changes for tests checking the view right after.
+        self._flush_updates()
 
     def _fake_scroll(self, x, y, step, fig=None):
         pass
@@ -2162,8 +5054,25 @@ class PyQtGraphPtyp(BrowserBase, QMainWindow, metaclass=_PGMetaClass):
 
     def closeEvent(self, event):
         event.accept()
+        self.mne.frame_timer.stop()
+        # Discard results of pending requests.
+        self.mne.window_request += 1
+        self.mne.window_pool.clear()
+        self.mne.window_pool.waitForDone()
+        render_pool = getattr(self.mne.batch_item, 'render_pool', None)
+        if render_pool is not None:
+            render_pool.clear()
+            render_pool.waitForDone()
+        self.cancel_preload()
+        if self.mne.stopping_runner is not None:
+            # Give the cancelled preload a bounded time to stop
+            # before its data is released.
+            self.mne.stopping_runner.done.wait(5)
+            self.mne.stopping_runner = None
+            self.mne.restart_preload = False
 
         self._close(event)
+        self._release_preload()
 
 
 qt_key_mapping = {
@@ -0,0 +1,31 @@
+import numpy as np
+import pytest
+
+pytest.importorskip('PyQt5')
+pytest.importorskip('pyqtgraph')
+pytest.importorskip('mne')
+
+from prototypes.pyqtgraph_ptyp import ColumnMeans  # noqa
+
+n_channels = 4
+n_times = 50011
+
+
+@pytest.mark.parametrize('n_cols', [1920, 333, 1, n_times + 10])
+@pytest.mark.parametrize('chunk_size', [1000, 4567])
+def test_column_means(n_cols, chunk_size):
+    """Test the means from shuffled chunks against a reshape-mean."""
+    rng = np.random.RandomState(0)
+    data = rng.randn(n_channels, n_times)
+    col_means = ColumnMeans(n_channels, n_times, n_cols)
+    starts = np.arange(0, n_times, chunk_size)
+    rng.shuffle(starts)
+    for start in starts:
+        col_means.add(data[:, start:start + chunk_size], start)
+    # Samples after the last full column are ignored.
+    n_cols = min(n_cols, n_times)
+    collapse_by = n_times // n_cols
+    expected = data[:, :n_cols * collapse_by].reshape(
+        n_channels, n_cols, collapse_by).mean(axis=-1)
+    assert col_means.means.shape == (n_channels, n_cols)
+    np.testing.assert_allclose(col_means.means, expected, atol=1e-12)
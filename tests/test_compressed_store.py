@@ -0,0 +1,53 @@
+import numpy as np
+import pytest
+
+pytest.importorskip('PyQt5')
+pytest.importorskip('pyqtgraph')
+pytest.importorskip('mne')
+
+from prototypes.pyqtgraph_ptyp import CompressedChunkStore  # noqa
+
+n_channels = 5
+n_times = 10500
+chunk_size = 1000
+# The preload writes chunks of another size than the compressed chunks.
+write_size = 700
+# Slices inside a chunk, across chunk-borders and to the end
+read_slices = [slice(0, 10), slice(990, 1010), slice(2500, 7333),
+               slice(9999, None), slice(None), slice(4000, 4000)]
+
+
+def _get_data(dtype):
+    rng = np.random.RandomState(0)
+    data = rng.randn(n_channels, n_times).cumsum(axis=1)
+    return (data * 100).astype(dtype)
+
+
+@pytest.mark.parametrize('dtype', [np.float64, np.float32, np.int16])
+def test_compressed_store(dtype):
+    """Test out-of-order writes and reads across chunk-borders."""
+    data = _get_data(dtype)
+    # A hot-cache of one chunk to decompress on most reads
+    store = CompressedChunkStore(
+        n_channels, n_times, dtype, chunk_size,
+        hot_cache_mb=n_channels * chunk_size * data.itemsize / 1e6)
+    starts = np.arange(0, n_times, write_size)
+    np.random.RandomState(1).shuffle(starts)
+    for start in starts:
+        stop = min(start + write_size, n_times)
+        store.write(start, data[:, start:stop])
+        # The written part can be read while its chunks are incomplete.
+        np.testing.assert_array_equal(store[:, start:stop],
+                                      data[:, start:stop])
+    # All chunks are compressed.
+    assert all(chunk is not None for chunk in store.chunks)
+    assert len(store._pending) == 0
+    assert store.nbytes < store.raw_nbytes
+    rows = [3, 0, 4]
+    for cols in read_slices:
+        out = store[:, cols]
+        assert out.dtype == dtype
+        np.testing.assert_array_equal(out, data[:, cols])
+        np.testing.assert_array_equal(store[rows, cols], data[rows, cols])
+    with pytest.raises(IndexError, match='contiguous'):
+        store[:, ::2]
@@ -0,0 +1,90 @@
+from types import MethodType, SimpleNamespace
+
+import numpy as np
+import pytest
+
+pytest.importorskip('PyQt5')
+pytest.importorskip('pyqtgraph')
+pytest.importorskip('mne')
+
+from prototypes.pyqtgraph_ptyp import (IncrementalWindow, LRUCache,  # noqa
+                                       PyQtGraphPtyp, RegularTimes,
+                                       _ds_kernels, _get_ds_kernels,
+                                       register_ds_kernel)
+
+sfreq = 1000.
+
+
+def _first_sample(times, data, ds):
+    """Keep the first sample of each bin (like subsample)."""
+    return times[::ds], np.asarray(data)[:, ::ds]
+
+
+@pytest.fixture
+def first_kernel():
+    register_ds_kernel('first', _first_sample, samples_per_bin=1,
+                       block_cacheable=True)
+    yield _get_ds_kernels()
+    _ds_kernels.pop('first')
+
+
+def _get_data(n_times=20000):
+    rng = np.random.RandomState(0)
+    return RegularTimes(n_times, sfreq), rng.randn(4, n_times)
+
+
+def _make_browser(times, data, ds_kernels):
+    """Get the browser-attributes used by _get_ds_blocks."""
+    browser = SimpleNamespace(mne=SimpleNamespace(
+        ds_kernels=ds_kernels, ds_chunk_size=1000, global_times=times,
+        global_data=data, ds_cache=LRUCache(1e8), ds_pyramid=None))
+    for name in ['_run_ds_kernel', '_get_ds_chunk_size', '_get_ds_blocks']:
+        setattr(browser, name,
+                MethodType(getattr(PyQtGraphPtyp, name), browser))
+    return browser
+
+
+def test_registered_kernel_times_are_arrays(first_kernel):
+    """Test that registered kernels get and return the times as arrays."""
+    times, data = _get_data()
+    times_ds, data_ds = first_kernel['first']['func'](times[100:200],
+                                                      data[:, 100:200], 10)
+    assert isinstance(times_ds, np.ndarray)
+    np.testing.assert_allclose(times_ds, np.arange(100, 200, 10) / sfreq)
+    np.testing.assert_allclose(data_ds, data[:, 100:200:10])
+
+
+@pytest.mark.parametrize('remove_dc', [False, True])
+def test_custom_kernel_incremental(first_kernel, remove_dc):
+    """Test a custom kernel on the incremental path."""
+    times, data = _get_data()
+    browser = _make_browser(times, data, first_kernel)
+    incr_window = IncrementalWindow(first_kernel)
+    ds = 10
+    for start in [1000, 1500, 9000]:
+        stop = start + 5000
+        window_times, window_data = incr_window.get_window(
+            times, data, start, stop, ds, 'first', remove_dc, 0)
+        full_times, full_data = browser._run_ds_kernel(
+            times[start:stop], data[:, start:stop], ds, 'first', remove_dc)
+        np.testing.assert_allclose(window_times, full_times)
+        np.testing.assert_allclose(window_data, full_data)
+    assert incr_window.n_updated == 1
+
+
+@pytest.mark.parametrize('remove_dc', [False, True])
+def test_custom_kernel_ds_cache(first_kernel, remove_dc):
+    """Test a custom kernel on the ds-cache path."""
+    times, data = _get_data()
+    browser = _make_browser(times, data, first_kernel)
+    ds = 10
+    for start in [1000, 1500, 9000]:
+        stop = start + 5000
+        view = dict(start=start, stop=stop, ds=ds, ds_method='first',
+                    generation=0)
+        window_times, window_data = browser._get_ds_blocks(view, remove_dc)
+        full_times, full_data = browser._run_ds_kernel(
+            times[start:stop], data[:, start:stop], ds, 'first', remove_dc)
+        np.testing.assert_allclose(window_times, full_times)
+        np.testing.assert_allclose(window_data, full_data)
+    assert browser.mne.ds_cache.hits > 0
@@ -0,0 +1,72 @@
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+pytest.importorskip('PyQt5')
+pytest.importorskip('pyqtgraph')
+pytest.importorskip('mne')
+
+from prototypes.pyqtgraph_ptyp import (IncrementalWindow,  # noqa
+                                       PyQtGraphPtyp, RegularTimes,
+                                       _get_ds_kernels, has_numba)
+
+n_times = 60000
+window_size = 3007
+# Starts of the window panned by less and more than one window to the
+# right and to the left (and back by a single sample).
+window_starts = [20003, 21000, 20500, 19001, 25500, 20011, 11000, 11001]
+
+
+def _get_data():
+    rng = np.random.RandomState(42)
+    data = rng.randn(3, n_times).cumsum(axis=1)
+    return RegularTimes(n_times, 1000.), data
+
+
+def _full_recompute(ds_kernels, times, data, start, stop, ds, ds_method,
+                    remove_dc):
+    """Downsample the full bins of the window with _run_ds_kernel."""
+    browser = SimpleNamespace(mne=SimpleNamespace(ds_kernels=ds_kernels))
+    b0, b1 = -(-start // ds), stop // ds
+    return PyQtGraphPtyp._run_ds_kernel(
+        browser, times[b0 * ds:b1 * ds], data[:, b0 * ds:b1 * ds], ds,
+        ds_method, remove_dc)
+
+
+@pytest.mark.parametrize('use_numba', [False, True] if has_numba
+                         else [False])
+@pytest.mark.parametrize('ds_method', ['subsample', 'mean', 'peak', 'm4'])
+@pytest.mark.parametrize('ds', [2, 7, 50])
+@pytest.mark.parametrize('remove_dc', [False, True])
+def test_incremental_window(use_numba, ds_method, ds, remove_dc):
+    """Test that panning matches the full recompute of the window."""
+    ds_kernels = _get_ds_kernels(use_numba)
+    times, data = _get_data()
+    incr_window = IncrementalWindow(ds_kernels)
+    for start in window_starts:
+        stop = start + window_size
+        window_times, window_data = incr_window.get_window(
+            times, data, start, stop, ds, ds_method, remove_dc, 0)
+        full_times, full_data = _full_recompute(
+            ds_kernels, times, data, start, stop, ds, ds_method, remove_dc)
+        np.testing.assert_allclose(window_times, full_times)
+        np.testing.assert_allclose(window_data, full_data, atol=1e-9)
+    # Overlapping pans are updated, the others recomputed.
+    assert incr_window.n_updated == 4
+    assert incr_window.n_recomputed == 4
+
+
+def test_incremental_window_generation():
+    """Test that a new generation recomputes the window."""
+    ds_kernels = _get_ds_kernels(False)
+    times, data = _get_data()
+    incr_window = IncrementalWindow(ds_kernels)
+    incr_window.get_window(times, data, 1000, 4000, 10, 'peak', False, 0)
+    data = data * 2
+    _, window_data = incr_window.get_window(times, data, 1500, 4500, 10,
+                                            'peak', False, 1)
+    _, full_data = _full_recompute(ds_kernels, times, data, 1500, 4500, 10,
+                                   'peak', False)
+    np.testing.assert_allclose(window_data, full_data)
+    assert incr_window.n_recomputed == 2
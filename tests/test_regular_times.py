@@ -0,0 +1,34 @@
+import numpy as np
+import pytest
+
+pytest.importorskip('PyQt5')
+pytest.importorskip('pyqtgraph')
+pytest.importorskip('mne')
+
+from prototypes.pyqtgraph_ptyp import RegularTimes  # noqa
+
+n_times = 100003
+
+
+@pytest.mark.parametrize('sfreq', [1000., 600.614990234375, 1234.5678])
+def test_regular_times(sfreq):
+    """Test that the times are bit-identical to np.arange(n) / sfreq."""
+    times = RegularTimes(n_times, sfreq)
+    expected = np.arange(n_times) / sfreq
+    assert len(times) == n_times
+    np.testing.assert_array_equal(np.asarray(times), expected)
+    # Slices (also of slices) and their steps
+    for key in [slice(None), slice(17, 60001), slice(5, None, 7),
+                slice(-1000, None), slice(None, None, -3)]:
+        np.testing.assert_array_equal(np.asarray(times[key]),
+                                      expected[key])
+    np.testing.assert_array_equal(np.asarray(times[100:][::7][3:500]),
+                                  expected[100:][::7][3:500])
+    np.testing.assert_array_equal(np.asarray(times[..., ::10]),
+                                  expected[..., ::10])
+    # Integers, negative integers, arrays and masks
+    for key in [0, 12345, -1, [3, 99999, -2], expected > 50.]:
+        np.testing.assert_array_equal(times[key], expected[key])
+    assert times[100:][5] == expected[105]
+    with pytest.raises(IndexError, match='out of bounds'):
+        times[n_times]